@@ -0,0 +1,52 @@
+"""advance_round time on a large bracket.
+
+Usage: python benchmarks/bench_advance.py [--entrants 1024] [--votes 1000000] [--wave-size 0]
+
+Seeds a synthetic tournament (votes spread over the round-1 matches), then
+advances it to the end, timing each call and counting the SQL statements it
+ran. --wave-size 0 plays every round as a single wave.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from flask import g
+
+from common import seed_database, temp_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entrants", type=int, default=1024)
+    parser.add_argument("--votes", type=int, default=1_000_000)
+    parser.add_argument("--wave-size", type=int, default=0)
+    args = parser.parse_args()
+
+    path = Path(tempfile.mkdtemp(prefix="bgby-bench-")) / "tournament.db"
+    start = time.perf_counter()
+    seed_database(path, entrants=args.entrants, votes=args.votes, wave=args.wave_size)
+    print(f"seeded {args.entrants} entrants, {args.votes} votes "
+          f"in {time.perf_counter() - start:.1f}s\n")
+
+    app = temp_app(DATABASE=str(path), WAVE_SIZE=args.wave_size)
+    print(f"{'round':>5}{'matches':>9}{'ms':>9}{'statements':>12}")
+    total = 0.0
+    while True:
+        with app.app_context():
+            from webapp.services import tournament
+            round_num = tournament.get_current_round()
+            start = time.perf_counter()
+            result = tournament.advance_round()
+            elapsed = time.perf_counter() - start
+            statements = g.sql_stats.count
+        if "error" in result:
+            break
+        total += elapsed
+        print(f"{round_num:>5}{result['advanced']:>9}{elapsed * 1000:>9.1f}{statements:>12}")
+    print(f"\ntotal advance time: {total * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
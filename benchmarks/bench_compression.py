@@ -0,0 +1,95 @@
+"""Response size and latency with and without compression and page streaming.
+
+Usage:
+  python benchmarks/bench_compression.py [--requests 50] [--entrants 0] [--mbps 5]
+
+Serves the same tournament twice over a local HTTP server: once as before
+(COMPRESS_RESPONSES and STREAM_PAGES off) and once as configured now. For
+each page it reports the bytes sent, the median time to first body byte and
+to the last one, for page-cache misses ("cold", the cache emptied before
+every request) and hits ("warm"), plus the transfer time the body alone
+would take on a --mbps link. --entrants N seeds a synthetic N-year bracket
+instead of copying tournament.db.
+"""
+
+import argparse
+import http.client
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from common import LocalServer, seed_database, temp_app, temp_database
+from webapp.page_cache import LRUCache
+
+PAGES = ("/bracket", "/results", "/bracket/data", "/")
+MODES = {
+    "before": {"COMPRESS_RESPONSES": False, "STREAM_PAGES": False},
+    "after": {},
+}
+
+
+def fetch(conn, path):
+    """(body bytes on the wire, seconds to first body byte, seconds to the end)."""
+    start = time.perf_counter()
+    conn.request("GET", path, headers={"Accept-Encoding": "br, gzip"})
+    resp = conn.getresponse()
+    first = resp.read1(1)  # with a stream, this is the first chunk
+    ttfb = time.perf_counter() - start
+    size = len(first) + len(resp.read())
+    return size, ttfb, time.perf_counter() - start
+
+
+def clear_caches(app):
+    for name in ("page_cache", "compress_cache"):
+        app.extensions[name] = LRUCache(app.config["PAGE_CACHE_ENTRIES"])
+
+
+def run(app, requests, cold):
+    results = {}
+    with LocalServer(app) as server:
+        conn = http.client.HTTPConnection(server.host, server.port)
+        for path in PAGES:
+            fetch(conn, path)  # warm up templates and the games cache
+            samples = []
+            for _ in range(requests):
+                if cold:
+                    clear_caches(app)
+                samples.append(fetch(conn, path))
+            results[path] = (
+                samples[-1][0],
+                statistics.median(s[1] for s in samples),
+                statistics.median(s[2] for s in samples),
+            )
+        conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="requests per page and mode")
+    parser.add_argument("--entrants", type=int, default=0, help="seed a synthetic bracket")
+    parser.add_argument("--mbps", type=float, default=5.0, help="link speed for the transfer estimate")
+    args = parser.parse_args()
+
+    if args.entrants:
+        database = str(Path(tempfile.mkdtemp(prefix="bgby-bench-")) / "tournament.db")
+        seed_database(database, entrants=args.entrants, votes=0)
+    else:
+        database = temp_database()
+
+    print(f"{'page':<14}{'cache':<7}{'mode':<8}{'bytes':>9}{'ttfb ms':>10}{'total ms':>10}"
+          f"{'+ link ms':>11}")
+    for cold in (True, False):
+        runs = {mode: run(temp_app(DATABASE=database, **config), args.requests, cold)
+                for mode, config in MODES.items()}
+        for path in PAGES:
+            for mode in MODES:
+                size, ttfb, total = runs[mode][path]
+                link = size * 8 / (args.mbps * 1e6)
+                print(f"{path:<14}{'cold' if cold else 'warm':<7}{mode:<8}{size:>9}"
+                      f"{ttfb * 1000:>10.2f}{total * 1000:>10.2f}{(total + link) * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
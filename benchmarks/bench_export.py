@@ -0,0 +1,84 @@
+"""Throughput and memory of the streaming vote export, with voting going on.
+
+Usage:
+  python benchmarks/bench_export.py [--votes 10000 100000 1000000] [--format csv] [--gzip]
+
+For each vote count, seeds a tournament, then streams the admin export to
+nowhere while a writer thread keeps committing votes. Reports export rows/s,
+the peak memory Python allocated during the export (tracemalloc), and the
+slowest single vote commit seen while it ran. The peak should stay about
+the same however many votes there are, and the commits should stay fast.
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from common import seed_database, temp_app
+
+ADMIN_SECRET = "bench"
+
+
+def keep_voting(path, stop, commit_times):
+    """Commit one vote at a time until `stop` is set, timing each commit."""
+    db = sqlite3.connect(path, timeout=30)
+    match_id, year = db.execute(
+        "SELECT match_id, year_a FROM matches WHERE year_a IS NOT NULL LIMIT 1"
+    ).fetchone()
+    n = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        db.execute(
+            "INSERT OR REPLACE INTO votes (match_id, voted_for, voter_id) VALUES (?, ?, ?)",
+            (match_id, year, f"bench-writer-{n}"),
+        )
+        db.commit()
+        commit_times.append(time.perf_counter() - start)
+        n += 1
+        time.sleep(0.001)
+    db.close()
+
+
+def run(votes, fmt, gzipped):
+    path = str(Path(tempfile.mkdtemp(prefix="bgby-bench-")) / "tournament.db")
+    seed_database(path, entrants=256, votes=votes)
+    app = temp_app(DATABASE=path, ADMIN_SECRET=ADMIN_SECRET)
+    client = app.test_client()
+    url = f"/admin/{ADMIN_SECRET}/export/votes.{fmt}" + ("?gzip=1" if gzipped else "")
+
+    stop, commit_times = threading.Event(), []
+    writer = threading.Thread(target=keep_voting, args=(path, stop, commit_times))
+    writer.start()
+    tracemalloc.start()
+    start = time.perf_counter()
+    resp = client.get(url)
+    size = sum(len(chunk) for chunk in resp.response)  # consume without buffering
+    resp.close()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stop.set()
+    writer.join()
+    return size, elapsed, peak, max(commit_times, default=0), len(commit_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--votes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'votes':>10}{'MB out':>9}{'rows/s':>11}{'peak KiB':>10}{'commits':>9}{'max commit ms':>15}")
+    for votes in args.votes:
+        size, elapsed, peak, slowest, commits = run(votes, args.format, args.gzip)
+        print(f"{votes:>10}{size / 1e6:>9.1f}{votes / elapsed:>11.0f}{peak / 1024:>10.0f}"
+              f"{commits:>9}{slowest * 1000:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Vote endpoint throughput and latency with group commit off and on.
+
+Usage: python benchmarks/bench_group_commit.py [--voters 200] [--votes-per-voter 4]
+
+Each simulated voter has its own voter_id cookie and votes on every active
+matchup over a keep-alive HTTP connection to a local threaded server.
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+import uuid
+
+from common import LocalServer, percentile, temp_app
+
+
+def run(group_commit, voters, votes_per_voter):
+    app = temp_app(VOTE_GROUP_COMMIT=group_commit)
+    with app.app_context():
+        from webapp.services import tournament
+        matchups = tournament.get_active_matchups()
+
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def voter(server):
+        conn = http.client.HTTPConnection(server.host, server.port)
+        headers = {
+            "Content-Type": "application/json",
+            "Cookie": f"voter_id={uuid.uuid4()}",
+        }
+        for i in range(votes_per_voter):
+            m = matchups[i % len(matchups)]
+            body = json.dumps({"year": m["year_a"] if i % 2 else m["year_b"]})
+            start = time.perf_counter()
+            conn.request("POST", f"/matchup/{m['match_id']}/vote", body, headers)
+            resp = conn.getresponse()
+            ok = json.loads(resp.read()).get("success")
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    failures.append(resp.status)
+        conn.close()
+
+    with LocalServer(app) as server:
+        threads = [threading.Thread(target=voter, args=(server,)) for _ in range(voters)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+
+    return {
+        "votes": len(latencies),
+        "failed": len(failures),
+        "votes_per_sec": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--voters", type=int, default=200)
+    parser.add_argument("--votes-per-voter", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'mode':<14}{'votes':>7}{'failed':>8}{'votes/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for label, enabled in (("per-vote", False), ("group-commit", True)):
+        r = run(enabled, args.voters, args.votes_per_voter)
+        print(f"{label:<14}{r['votes']:>7}{r['failed']:>8}{r['votes_per_sec']:>10.0f}"
+              f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
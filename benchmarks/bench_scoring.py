@@ -0,0 +1,54 @@
+"""Year scoring speed over a full-size ranking.
+
+Usage: python benchmarks/bench_scoring.py [--games 100000] [--years 128] [--repeat 5]
+
+Times loading a games table of that size into column arrays, then scoring
+every year under every registered formula (best of --repeat runs).
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from common import seed_database
+from webapp.scoring import FORMULAS, Ranking, score_years
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=128, help="a power of two")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = Path(tempfile.mkdtemp(prefix="bgby-bench-")) / "tournament.db"
+    seed_database(path, entrants=args.years, games_per_year=args.games // args.years, votes=0)
+    db = sqlite3.connect(path)
+
+    load, ranking = best_of(args.repeat, lambda: Ranking.from_db(db))
+    print(f"{len(ranking.rank)} games, {len(ranking.years)} years")
+    print(f"{'load from games table':<24}{load * 1000:>9.1f} ms")
+
+    # A fresh Ranking each run, so grouping and cached columns are timed too
+    year, rank = ranking.years[ranking.year_index], ranking.rank
+    for name in FORMULAS:
+        elapsed, _ = best_of(args.repeat, lambda: score_years(Ranking(year, rank), [name]))
+        print(f"{name:<24}{elapsed * 1000:>9.1f} ms")
+    total, _ = best_of(args.repeat, lambda: score_years(Ranking(year, rank)))
+    print(f"{'all formulas':<24}{total * 1000:>9.1f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
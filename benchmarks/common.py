@@ -0,0 +1,114 @@
+"""Shared helpers for the benchmark scripts: throwaway apps and a local server."""
+
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from webapp.app import create_app
+from webapp.config import Config
+from webapp.database import migrate
+from webapp.importer import create_bracket
+
+
+def temp_database(source=Config.DATABASE):
+    """Copy a tournament database into a temp dir with voting open (no deadline)."""
+    path = Path(tempfile.mkdtemp(prefix="bgby-bench-")) / "tournament.db"
+    shutil.copy(source, path)
+    db = sqlite3.connect(path)
+    db.execute("DELETE FROM tournament_state WHERE key = 'voting_deadline'")
+    db.commit()
+    db.close()
+    return str(path)
+
+
+def seed_database(path, entrants=1024, games_per_year=100, votes=100_000, wave=4, seed=1):
+    """Create a synthetic tournament database at `path` for large-scale runs.
+
+    `entrants` years (a power of two) with `games_per_year` ranked games each,
+    a full bracket (see importer.create_bracket) with the first `wave`
+    round-1 matches active (0 for all of them), and `votes` votes spread over
+    the round-1 matches with tallies to match. Voting is open (no deadline).
+    """
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    migrate(db)
+    years = list(range(1000, 1000 + entrants))
+    db.executemany(
+        "INSERT INTO years (year, total_games, top500_games, score, seed) VALUES (?, ?, ?, ?, ?)",
+        ((y, games_per_year, games_per_year // 5, float(entrants - i), i + 1)
+         for i, y in enumerate(years)),
+    )
+    db.executemany(
+        "INSERT INTO games (name, year_published, rank) VALUES (?, ?, ?)",
+        ((f"Game {n}", years[n % entrants], n + 1) for n in range(entrants * games_per_year)),
+    )
+
+    create_bracket(db, years, wave)
+    first_round = db.execute(
+        "SELECT match_id, year_a, year_b FROM matches WHERE round = 1 ORDER BY position"
+    ).fetchall()
+
+    def vote_rows():
+        # Each voter votes once in every round-1 match before the next voter starts
+        for n in range(votes):
+            match_id, year_a, year_b = first_round[n % len(first_round)]
+            yield match_id, rng.choice((year_a, year_b)), f"voter-{n // len(first_round)}"
+
+    db.executemany(
+        "INSERT INTO votes (match_id, voted_for, voter_id) VALUES (?, ?, ?)", vote_rows()
+    )
+    db.execute("""
+        INSERT INTO vote_tallies (match_id, year, count)
+        SELECT match_id, voted_for, COUNT(*) FROM votes GROUP BY match_id, voted_for
+    """)
+    db.execute("INSERT INTO tournament_state (key, value) VALUES ('current_round', '1')")
+    db.commit()
+    db.close()
+    return str(path)
+
+
+def temp_app(**config):
+    config.setdefault("DATABASE", temp_database())
+    # Simulated voters all come from 127.0.0.1
+    config.setdefault("RATE_LIMIT_ENABLED", False)
+    return create_app(config)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class LocalServer:
+    """A threaded werkzeug server for `app` on an ephemeral localhost port."""
+
+    def __init__(self, app):
+        self.server = make_server(
+            "127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler
+        )
+        self.host, self.port = "127.0.0.1", self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
@@ -0,0 +1,257 @@
+"""End-to-end load test: simulated voters working through voting waves.
+
+Usage:
+  python benchmarks/loadtest.py [--voters 2000] [--concurrency 32] [--waves 3]
+                                [--client http|flask] [--group-commit]
+                                [--batch-share 0.5]
+
+Seeds a fresh tournament (a reset copy of tournament.db) in a temp dir, then
+for each wave lets every simulated voter — each with its own voter_id cookie
+— load the landing page and /me, then vote the way the UI does: either
+picking on the landing page and sending the picks together to /votes/batch
+(--batch-share of voters), or opening matchups one at a time and voting on
+each page. Either way some switch sides afterwards from the matchup page,
+and some view the bracket. The admin advance endpoint closes each wave.
+At the end the stored tallies and winners are checked against the votes
+the simulation actually had accepted.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from common import LocalServer, percentile, temp_app
+
+ADMIN_SECRET = "loadtest"
+
+
+def reset_tournament(app):
+    """Reset the app's (temp) database to round 1 with no votes, like the admin reset."""
+    with app.app_context():
+        from webapp.database import get_db
+        from webapp.services import tournament
+        from webapp.services.state import bump_version
+        db = get_db()
+        db.executescript("""
+            DELETE FROM voter_finalizations;
+            DELETE FROM votes;
+            DELETE FROM vote_tallies;
+            UPDATE matches SET winner = NULL, is_active = 0;
+            UPDATE matches SET year_a = NULL, year_b = NULL WHERE round > 1;
+            UPDATE tournament_state SET value = '1' WHERE key = 'current_round';
+            DELETE FROM tournament_state WHERE key = 'results_revealed';
+        """)
+        tournament.open_next_wave(1)
+        bump_version()
+        db.commit()
+
+
+class HttpClient:
+    """One keep-alive connection per worker thread to the local server."""
+
+    def __init__(self, server):
+        self.server = server
+        self.local = threading.local()
+
+    def request(self, method, path, cookie, body=None):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.server.host, self.server.port)
+        headers = {"Cookie": f"voter_id={cookie}"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(body)
+        try:
+            conn.request(method, path, body, headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.HTTPException, OSError):
+            self.local.conn = None
+            conn.close()
+            raise
+
+
+class FlaskClient:
+    """In-process requests through the Flask test client (no sockets)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, cookie, body=None):
+        client = self.app.test_client()
+        client.set_cookie("voter_id", cookie)
+        resp = client.open(path, method=method, json=body)
+        return resp.status_code, resp.get_data()
+
+
+class LoadTest:
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.picks = {}  # (voter_id, match_id) -> year, for accepted votes only
+
+    def timed(self, route, method, path, cookie, body=None):
+        start = time.perf_counter()
+        try:
+            status, data = self.client.request(method, path, cookie, body)
+        except Exception:
+            status, data = 599, b""
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies[route].append(elapsed)
+            if status >= 400:
+                self.errors[route] += 1
+        return status, data
+
+    def voter_session(self, voter_id, matchups, batch_share):
+        rng = random.Random(f"{voter_id}")
+        self.timed("/", "GET", "/", voter_id)
+        self.timed("/me", "GET", "/me", voter_id)
+        # Most voters vote on most of the wave; some only browse
+        chosen = [(m, rng.choice((m["year_a"], m["year_b"])))
+                  for m in matchups if rng.random() >= 0.15]
+        if chosen and rng.random() < batch_share:
+            # Quick picks on the landing page, sent together
+            self.vote_batch(voter_id, [(m["match_id"], year) for m, year in chosen])
+        else:
+            for m, year in chosen:
+                self.open_matchup(voter_id, m)
+                self.vote(voter_id, m["match_id"], year)
+        for m, year in chosen:
+            if rng.random() < 0.1:
+                # Change of heart: switch sides from the matchup page
+                self.open_matchup(voter_id, m)
+                self.vote(voter_id, m["match_id"], m["year_b"] if year == m["year_a"] else m["year_a"])
+        if rng.random() < 0.3:
+            self.timed("/bracket", "GET", "/bracket", voter_id)
+            self.timed("/me", "GET", "/me", voter_id)
+
+    def open_matchup(self, voter_id, m):
+        self.timed("/matchup/<id>", "GET", f"/matchup/{m['match_id']}", voter_id)
+        self.timed("/me", "GET", "/me", voter_id)
+
+    def vote_batch(self, voter_id, picks):
+        status, data = self.timed(
+            "/votes/batch", "POST", "/votes/batch", voter_id,
+            {"picks": [{"match_id": match_id, "year": year} for match_id, year in picks]},
+        )
+        results = json.loads(data).get("results", []) if status == 200 else []
+        with self.lock:
+            for r in results:
+                if r["success"]:
+                    self.picks[(voter_id, r["match_id"])] = r["voted_for"]
+            self.errors["vote rejected"] += len(picks) - sum(r["success"] for r in results)
+
+    def vote(self, voter_id, match_id, year):
+        status, data = self.timed(
+            "/matchup/<id>/vote", "POST", f"/matchup/{match_id}/vote", voter_id, {"year": year}
+        )
+        if status == 200 and json.loads(data).get("success"):
+            with self.lock:
+                self.picks[(voter_id, match_id)] = year
+        else:
+            with self.lock:
+                self.errors["vote rejected"] += 1
+
+
+def active_matchups(app):
+    with app.app_context():
+        from webapp.services import tournament
+        return tournament.get_active_matchups()
+
+
+def verify(app, picks):
+    """Compare stored tallies and winners with the votes the simulation placed."""
+    expected = Counter((match_id, year) for (_, match_id), year in picks.items())
+    problems = []
+    with app.app_context():
+        from webapp.services import tallies, tournament
+        stored = tallies.get_tallies()
+        for (match_id, year), count in expected.items():
+            got = stored.get(match_id, {}).get(year, 0)
+            if got != count:
+                problems.append(f"match {match_id} / {year}: expected {count}, stored {got}")
+        seeds = {y["year"]: y["seed"] for y in tournament.get_all_years()}
+        for m in tournament.get_completed_matches():
+            a = expected[(m["match_id"], m["year_a"])]
+            b = expected[(m["match_id"], m["year_b"])]
+            # Most votes wins; a tie goes to the better seed
+            want = m["year_a"] if (-a, seeds[m["year_a"]]) < (-b, seeds[m["year_b"]]) else m["year_b"]
+            if (m["votes_a"], m["votes_b"]) != (a, b) or m["winner"] != want:
+                problems.append(f"match {m['match_id']}: {m['votes_a']}-{m['votes_b']} "
+                                f"winner {m['winner']}, expected {a}-{b} winner {want}")
+        drift = tallies.reconcile_tallies()
+        problems += [f"reconcile drift: {d}" for d in drift]
+    return problems
+
+
+def report(test, wall):
+    print(f"\n{'route':<22}{'reqs':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, samples in sorted(test.latencies.items()):
+        print(f"{route:<22}{len(samples):>8}{test.errors[route]:>8}{len(samples) / wall:>9.0f}"
+              f"{percentile(samples, 50) * 1000:>9.1f}{percentile(samples, 95) * 1000:>9.1f}"
+              f"{percentile(samples, 99) * 1000:>9.1f}")
+    if test.errors["vote rejected"]:
+        print(f"\nvotes rejected: {test.errors['vote rejected']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--voters", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--waves", type=int, default=3)
+    parser.add_argument("--client", choices=["http", "flask"], default="http")
+    parser.add_argument("--group-commit", action="store_true")
+    parser.add_argument("--batch-share", type=float, default=0.5,
+                        help="share of voters who send their picks to /votes/batch")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    app = temp_app(ADMIN_SECRET=ADMIN_SECRET, VOTE_GROUP_COMMIT=args.group_commit)
+    reset_tournament(app)
+    rng = random.Random(args.seed)
+    voters = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(args.voters)]
+
+    server = LocalServer(app) if args.client == "http" else None
+    if server:
+        server.__enter__()
+    client = HttpClient(server) if server else FlaskClient(app)
+    test = LoadTest(client)
+
+    start = time.perf_counter()
+    try:
+        for wave in range(1, args.waves + 1):
+            matchups = active_matchups(app)
+            if not matchups:
+                print("Tournament finished before the requested number of waves.")
+                break
+            wave_start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                list(pool.map(lambda v: test.voter_session(v, matchups, args.batch_share), voters))
+            test.timed("advance", "POST", f"/admin/{ADMIN_SECRET}/advance", "admin")
+            print(f"wave {wave}: {len(matchups)} matchups, "
+                  f"{time.perf_counter() - wave_start:.1f}s")
+    finally:
+        if server:
+            server.__exit__(None, None, None)
+    wall = time.perf_counter() - start
+
+    report(test, wall)
+    problems = verify(app, test.picks)
+    print(f"\ntally check: {len(test.picks)} accepted picks, "
+          + ("OK" if not problems else f"{len(problems)} mismatches"))
+    for p in problems[:20]:
+        print("  " + p)
+    raise SystemExit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Query-plan guard: EXPLAIN QUERY PLAN for every statement the app issues.
+
+Usage:
+  python benchmarks/query_plans.py [--entrants 1024] [--votes 200000] [--update]
+
+Seeds a large synthetic tournament, drives every route and the service
+functions routes don't reach, and collects each distinct SQL statement from
+the per-request SQL stats (see database.QueryStats). Each statement is then
+explained against the seeded database.
+
+Exits non-zero if a plan does a full SCAN of votes or games that isn't in
+ALLOWED_SCANS. When plans differ from the ones recorded in query_plans.txt
+they are shown as a unified diff; --update records the current plans.
+
+tests/test_query_plans.py runs the same guard and diff on the test
+tournament, so pytest fails on a new scan or an unrecorded plan change.
+"""
+
+import argparse
+import difflib
+import re
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import g
+
+from common import seed_database, temp_app
+from webapp.services import export
+
+ADMIN_SECRET = "plans"
+RECORDED = Path(__file__).with_name("query_plans.txt")
+GUARDED_TABLES = {"votes", "games"}
+
+# Statements that may scan a guarded table, and why that is fine
+ALLOWED_SCANS = {
+    "SELECT COUNT(DISTINCT voter_id) as c FROM votes":
+        "unique voters needs every voter_id; scans the covering idx_votes_voter",
+    "SELECT match_id, voted_for, COUNT(*) as c FROM votes GROUP BY match_id, voted_for":
+        "reconcile_tallies recounts everything on purpose; scans idx_votes_match",
+    "INSERT INTO vote_tallies (match_id, year, count) SELECT match_id, voted_for, COUNT(*) "
+    "FROM votes GROUP BY match_id, voted_for":
+        "reconcile_tallies rebuilding the table from that recount",
+}
+# The vote export reads every vote (or every vote in a time range) by design
+ALLOWED_SCANS.update({
+    export.build_query(filters)[0]: "vote export streams the whole table in vote_id order"
+    for filters in ({}, {"since": "", "until": ""})
+})
+
+EXPORT_FILTERS = ({}, {"round": 1}, {"match": 1}, {"since": "", "until": ""})
+
+CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA")
+
+
+def collect_statements(app):
+    """Run the app through a whole wave cycle and return every SQL statement seen."""
+    seen = set()
+
+    @app.teardown_appcontext
+    def collect(exc):
+        stats = g.get("sql_stats")
+        if stats is not None and stats.statements:
+            seen.update(sql for sql, _ in stats.statements)
+
+    client = app.test_client()
+    client.set_cookie("voter_id", "plan-voter")
+    admin = f"/admin/{app.config['ADMIN_SECRET']}"
+
+    with app.app_context():
+        from webapp.services import tournament
+        matchups = tournament.get_active_matchups()
+        later = tournament.get_all_matches()[-1]
+
+    for path in ("/", "/me", "/bracket", "/bracket/data", "/results", admin, admin + "/metrics",
+                 f"/matchup/{matchups[0]['match_id']}", f"/matchup/{later['match_id']}",
+                 f"/year/{matchups[0]['year_a']}/games?page=2"):
+        client.get(path)
+    m = matchups[0]
+    for year in (m["year_a"], m["year_b"]):
+        client.post(f"/matchup/{m['match_id']}/vote", json={"year": year})
+    client.post("/votes/batch", json={"picks": [
+        {"match_id": p["match_id"], "year": p["year_a"]} for p in matchups
+    ]})
+    client.get("/me")
+    client.post(admin + "/reveal/1")
+    client.get("/live/results")
+
+    client.post(admin + "/set_deadline", data={"deadline": "2999-01-01T00:00"})
+    client.post(admin + "/set_deadline", data={"deadline": ""})
+    client.post(admin + "/advance")
+    client.post(admin + "/reveal/1")
+    client.get("/results")
+    client.get("/me")
+    client.post(admin + "/reset_wave")
+    client.post(admin + "/advance")
+    client.post(admin + "/reset_round")
+    client.post(admin + "/reconcile_tallies")
+    client.get(admin + "/export/votes.csv").get_data()
+    client.get(admin + "/export/votes.ndjson?round=1&gzip=1").get_data()
+
+    # The export reads on its own connection, which sql_stats doesn't see
+    for filters in EXPORT_FILTERS:
+        for paged in (False, True):
+            seen.add(export.build_query(filters, paged)[0])
+
+    # Service functions no route reaches on its own
+    with app.test_request_context():
+        from webapp.services import tournament, voting
+        voting.has_voted(m["match_id"], "plan-voter")
+        voting.finalize_voter("plan-voter")
+        voting.is_voter_finalized("plan-voter")
+        tournament.get_completed_matches(1)
+
+    client.post(admin + "/reset")
+    return sorted(seen)
+
+
+def explain(db, sql):
+    """The plan as indented lines, one per EXPLAIN QUERY PLAN node."""
+    rows = db.execute("EXPLAIN QUERY PLAN " + sql, (None,) * sql.count("?")).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def guarded_scans(plan):
+    tables = []
+    for line in plan:
+        match = re.match(r"SCAN (\w+)", line.strip())
+        if match and match.group(1) in GUARDED_TABLES:
+            tables.append(match.group(1))
+    return tables
+
+
+def check_plans(path, statements):
+    """Explain `statements` against the database at `path`.
+
+    Returns the report recorded in query_plans.txt and the (sql, plan) pairs
+    that scan a guarded table without being in ALLOWED_SCANS.
+    """
+    db = sqlite3.connect(path)
+    report, failures = [], []
+    for sql in statements:
+        if sql.split(None, 1)[0].upper() in CONTROL:
+            continue
+        plan = explain(db, sql)
+        report += [sql] + ["  " + line for line in plan] + [""]
+        if guarded_scans(plan) and sql not in ALLOWED_SCANS:
+            failures.append((sql, plan))
+    db.close()
+    return "\n".join(report), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entrants", type=int, default=1024)
+    parser.add_argument("--votes", type=int, default=200_000)
+    parser.add_argument("--update", action="store_true", help="record the current plans")
+    args = parser.parse_args()
+
+    path = Path(tempfile.mkdtemp(prefix="bgby-plans-")) / "tournament.db"
+    seed_database(path, entrants=args.entrants, votes=args.votes)
+    app = temp_app(DATABASE=str(path), ADMIN_SECRET=ADMIN_SECRET, SLOW_REQUEST_MS=float("inf"))
+    statements = collect_statements(app)
+
+    current, failures = check_plans(path, statements)
+    recorded = RECORDED.read_text() if RECORDED.exists() else ""
+    if args.update:
+        RECORDED.write_text(current)
+        print(f"Recorded {len(statements)} statements in {RECORDED.name}")
+    elif current != recorded:
+        print(f"Query plans differ from {RECORDED.name} (rerun with --update to accept):\n")
+        sys.stdout.writelines(difflib.unified_diff(
+            recorded.splitlines(True), current.splitlines(True), RECORDED.name, "current"
+        ))
+        print()
+
+    stale = set(ALLOWED_SCANS) - set(statements)
+    for sql in sorted(stale):
+        print(f"note: allow-listed statement no longer issued: {sql}")
+    for sql, plan in failures:
+        print(f"FULL SCAN: {sql}\n" + "\n".join("    " + line for line in plan))
+    print(f"{len(statements)} statements checked, {len(failures)} unexpected scans")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Shared fixtures: throwaway tournaments and apps built on them."""
+
+import sqlite3
+
+import pytest
+
+from webapp.app import create_app
+from webapp.database import REBUILD_YEAR_STATS, migrate
+from webapp.importer import create_bracket
+
+ADMIN_SECRET = "test-secret"
+
+
+def seed(path, entrants=8, games_per_year=5, wave=4):
+    """A tournament of `entrants` years (a power of two), voting open, no votes."""
+    db = sqlite3.connect(path)
+    migrate(db)
+    years = list(range(1000, 1000 + entrants))
+    db.executemany(
+        "INSERT INTO years (year, total_games, top500_games, score, seed) VALUES (?, ?, ?, ?, ?)",
+        ((y, games_per_year, 1, float(entrants - i), i + 1) for i, y in enumerate(years)),
+    )
+    db.executemany(
+        "INSERT INTO games (name, year_published, rank, thumbnail_url) VALUES (?, ?, ?, ?)",
+        ((f"Game {n}", years[n % entrants], n + 1, f"https://example.com/{n}.jpg")
+         for n in range(entrants * games_per_year)),
+    )
+    for sql in REBUILD_YEAR_STATS:
+        db.execute(sql)
+    create_bracket(db, years, wave)
+    db.execute("INSERT INTO tournament_state (key, value) VALUES ('current_round', '1')")
+    db.commit()
+    db.close()
+    return str(path)
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """make_app(entrants=8, **config) -> a Flask app on a fresh seeded database."""
+    count = 0
+
+    def make(entrants=8, **config):
+        nonlocal count
+        count += 1
+        path = seed(tmp_path / f"tournament-{count}.db", entrants, wave=config.get("WAVE_SIZE", 4))
+        config = {"DATABASE": path, "ADMIN_SECRET": ADMIN_SECRET, "TESTING": True,
+                  "RATE_LIMIT_ENABLED": False, **config}
+        return create_app(config)
+
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
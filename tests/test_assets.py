@@ -0,0 +1,89 @@
+"""Minifiers, the fingerprinted build, and serving the built files."""
+
+import gzip
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from webapp import assets
+
+
+@pytest.mark.parametrize("source, minified", [
+    # A "/" after an operand divides; after "(" or "," or "return" it starts a regex
+    ("var r = a / b / c;", "var r=a/b/c;\n"),
+    ('s.replace(/\\/\\/ [a/]+/g, "");', 's.replace(/\\/\\/ [a/]+/g,"");\n'),
+    ("if (x) return /ab+c/i.test(y);", "if(x)return/ab+c/i.test(y);\n"),
+    ('var s = "http://x // no /* no */"; // gone\n/* gone */ var t = 1;',
+     'var s="http://x // no /* no */";\nvar t=1;\n'),
+    ("var t = `a // ${b + 1} /* c */`;", "var t=`a // ${b + 1} /* c */`;\n"),
+    ("var c = a + +b - -d;", "var c=a+ +b- -d;\n"),
+    ("function f() {\n\n    return 1\n}\n", "function f(){\nreturn 1\n}\n"),
+])
+def test_minify_js(source, minified):
+    assert assets.minify_js(source) == minified
+
+
+def test_minify_css_keeps_strings():
+    css = '/* gone */ a::before { content: "/* kept */  x" ; }\n\n.b > .c , .d { margin: 0 auto; }'
+    assert assets.minify_css(css) == 'a::before{content:"/* kept */  x"}.b>.c,.d{margin:0 auto}\n'
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="node is not installed")
+def test_minified_app_scripts_parse(tmp_path):
+    for path in (assets.STATIC_DIR / "js").glob("*.js"):
+        out = tmp_path / path.name
+        out.write_text(assets.minify_js(path.read_text()))
+        subprocess.run(["node", "--check", str(out)], check=True)
+
+
+@pytest.fixture
+def built(app, tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text("// app\n" + "console.log('hello');\n" * 200)
+    manifest = assets.build(tmp_path)
+    app.static_folder = str(tmp_path)
+    app.extensions["assets"] = manifest
+    return manifest
+
+
+def test_build_writes_hashed_and_gzipped_copies(built, tmp_path):
+    hashed = built["assets"]["js/app.js"]
+    assert hashed.startswith("dist/js/app.") and hashed != "dist/js/app.js"
+    assert built["encoded"][hashed][-1] == "gzip"
+    minified = (tmp_path / hashed).read_bytes()
+    assert minified == assets.minify_js((tmp_path / "js" / "app.js").read_text()).encode()
+    assert gzip.decompress((tmp_path / (hashed + ".gz")).read_bytes()) == minified
+
+
+def test_serves_precompressed_copy(app, built, tmp_path):
+    hashed = built["assets"]["js/app.js"]
+    with app.test_request_context():
+        from flask import url_for
+        assert url_for("static", filename="js/app.js").endswith(hashed)
+    client = app.test_client()
+
+    resp = client.get(f"/static/{hashed}", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(resp.get_data()) == (tmp_path / hashed).read_bytes()
+    assert "Accept-Encoding" in resp.vary
+    assert resp.headers["Cache-Control"] == assets.IMMUTABLE
+
+    plain = client.get(f"/static/{hashed}")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data() == (tmp_path / hashed).read_bytes()
+    assert plain.headers["Cache-Control"] == assets.IMMUTABLE
+
+
+def test_manifest_older_than_sources_is_ignored(tmp_path):
+    (tmp_path / "js").mkdir()
+    source = tmp_path / "js" / "app.js"
+    source.write_text("var a = 1;\n")
+    manifest = assets.build(tmp_path)
+    assert assets.load_manifest(tmp_path) == manifest
+
+    source.write_text("var a = 2;\n")
+    built = (tmp_path / assets.DIST / assets.MANIFEST).stat().st_mtime
+    os.utime(source, (built + 1, built + 1))
+    assert assets.load_manifest(tmp_path) == {"assets": {}, "encoded": {}}
@@ -0,0 +1,53 @@
+"""Negotiated compression of pages, buffered and streamed."""
+
+import gzip
+
+import pytest
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def buffered(make_app):
+    # A bracket big enough to be worth compressing, rendered in one piece
+    return make_app(entrants=32, STREAM_PAGES=False)
+
+
+def test_large_page_is_gzipped(buffered):
+    client = buffered.test_client()
+    plain = client.get("/bracket")
+    assert "Content-Encoding" not in plain.headers
+    assert len(plain.get_data()) >= buffered.config["COMPRESS_MIN_BYTES"]
+
+    resp = client.get("/bracket", headers=GZIP)
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.vary and "Accept-Encoding" in plain.vary
+    assert len(resp.get_data()) < len(plain.get_data())
+    assert gzip.decompress(resp.get_data()) == plain.get_data()
+    # Compressed once per ETag and encoding, then served from the cache
+    assert client.get("/bracket", headers=GZIP).get_data() == resp.get_data()
+
+
+def test_compressed_page_revalidates(buffered):
+    client = buffered.test_client()
+    resp = client.get("/bracket", headers=GZIP)
+    etag, weak = resp.get_etag()
+    assert weak and resp.headers["ETag"].startswith("W/")
+    assert etag == client.get("/bracket").get_etag()[0]
+
+    again = client.get("/bracket", headers={**GZIP, "If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_small_response_is_not_compressed(buffered):
+    resp = buffered.test_client().get("/me", headers=GZIP)
+    assert len(resp.get_data()) < buffered.config["COMPRESS_MIN_BYTES"]
+    assert "Content-Encoding" not in resp.headers
+
+
+def test_streamed_page_matches_buffered(make_app, buffered):
+    streamed = make_app(entrants=32, STREAM_PAGES=True, STREAM_CHUNK_BYTES=512)
+    resp = streamed.test_client().get("/bracket", headers=GZIP)
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in resp.headers
+    assert gzip.decompress(resp.get_data()) == buffered.test_client().get("/bracket").get_data()
@@ -0,0 +1,103 @@
+"""The admin vote export: filters, formats and access."""
+
+import csv
+import gzip
+import io
+import json
+import sqlite3
+
+import pytest
+
+from conftest import ADMIN_SECRET
+from webapp.services import tournament
+
+EXPORT = f"/admin/{ADMIN_SECRET}/export/votes"
+
+
+def vote(app, voter, matches):
+    client = app.test_client()
+    client.set_cookie("voter_id", voter)
+    for m in matches:
+        assert client.post(f"/matchup/{m['match_id']}/vote", json={"year": m["year_a"]}).json["success"]
+
+
+@pytest.fixture
+def voted(app, client):
+    """Two voters in every round-1 match and one in round 2, at known times (UTC)."""
+    with app.app_context():
+        first = tournament.get_active_matchups()
+    vote(app, "early", first)
+    vote(app, "late", first)
+    client.post(f"/admin/{ADMIN_SECRET}/advance")
+    with app.app_context():
+        second = tournament.get_active_matchups()
+    vote(app, "late", second)
+
+    db = sqlite3.connect(app.config["DATABASE"])
+    db.execute("UPDATE votes SET voted_at = '2026-01-01 10:00:00' WHERE voter_id = 'early'")
+    db.execute("UPDATE votes SET voted_at = '2026-01-02 10:00:00' WHERE voter_id = 'late'")
+    db.commit()
+    db.close()
+    return first, second
+
+
+def rows(client, query=""):
+    resp = client.get(f"{EXPORT}.ndjson{query}")
+    assert resp.status_code == 200
+    return [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+
+
+def test_csv_has_every_vote_oldest_first(client, voted):
+    first, second = voted
+    resp = client.get(f"{EXPORT}.csv")
+    assert resp.mimetype == "text/csv"
+    assert resp.headers["Content-Disposition"].startswith("attachment;")
+    lines = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert len(lines) == 2 * len(first) + len(second)
+    assert [int(r["vote_id"]) for r in lines] == sorted(int(r["vote_id"]) for r in lines)
+    assert lines[0]["voter_id"] == "early" and lines[0]["round"] == "1"
+
+
+def test_ndjson_matches_csv(client, voted):
+    records = rows(client)
+    lines = list(csv.DictReader(io.StringIO(client.get(f"{EXPORT}.csv").get_data(as_text=True))))
+    assert [r["vote_id"] for r in records] == [int(r["vote_id"]) for r in lines]
+    assert records[0]["voted_at"] == "2026-01-01 10:00:00"
+
+
+def test_round_and_match_filters(client, voted):
+    first, second = voted
+    assert {r["round"] for r in rows(client, "?round=2")} == {2}
+    assert len(rows(client, "?round=1")) == 2 * len(first)
+    match_id = first[0]["match_id"]
+    assert {(r["match_id"], r["voter_id"]) for r in rows(client, f"?match={match_id}")} == {
+        (match_id, "early"), (match_id, "late")}
+
+
+def test_time_range_filters(client, voted):
+    assert {r["voter_id"] for r in rows(client, "?until=2026-01-02")} == {"early"}
+    assert {r["voter_id"] for r in rows(client, "?since=2026-01-02T00:00")} == {"late"}
+    # The admin form's datetime-local values and explicit offsets both work
+    assert rows(client, "?since=2026-01-01T09:00&until=2026-01-01T11:00")
+    assert {r["voter_id"] for r in rows(client, "?since=2026-01-02T14:30:00%2B05:00")} == {"late"}
+    assert rows(client, "?since=2026-01-02T15:30:00%2B05:00") == []
+
+
+def test_gzip(client, voted):
+    plain = client.get(f"{EXPORT}.csv").get_data()
+    resp = client.get(f"{EXPORT}.csv?gzip=1")
+    assert resp.mimetype == "application/gzip"
+    assert resp.headers["Content-Disposition"].endswith('.csv.gz"')
+    assert gzip.decompress(resp.get_data()) == plain
+
+
+@pytest.mark.parametrize("query", ["?round=one", "?match=1.5", "?since=yesterday", "?until=2026-13-01"])
+def test_bad_filter_values(client, query):
+    resp = client.get(f"{EXPORT}.csv{query}")
+    assert resp.status_code == 400
+    assert "Bad value for" in resp.get_data(as_text=True)
+
+
+def test_needs_the_admin_secret(client):
+    assert client.get("/admin/wrong/export/votes.csv").status_code == 403
+    assert client.get(f"{EXPORT}.xml").status_code == 404
@@ -0,0 +1,27 @@
+"""Paged game tiles for the matchup pages."""
+
+
+def cache_sizes(app):
+    return {name: len(app.extensions[name]._entries)
+            for name in ("games_cache", "games_page_cache", "page_cache")}
+
+
+def test_game_pages(make_app):
+    app = make_app(GAMES_PAGE_SIZE=2)  # 5 games a year: pages 1-3
+    client = app.test_client()
+    last = client.get("/year/1000/games?page=3")
+    assert last.status_code == 200
+    assert last.json["next_page"] is None and last.json["remaining"] == 0
+    assert client.get("/year/1000/games?page=1").json["next_page"] == 2
+
+
+def test_unknown_year_or_page_is_not_found_and_not_cached(make_app):
+    app = make_app(GAMES_PAGE_SIZE=2)
+    client = app.test_client()
+    client.get("/year/1000/games?page=1")
+    before = cache_sizes(app)
+    assert client.get("/year/123456/games").status_code == 404
+    assert client.get("/year/1000/games?page=4").status_code == 404
+    assert client.get("/year/1000/games?page=99999").status_code == 404
+    assert client.get("/year/1000/games?page=0").status_code == 400
+    assert cache_sizes(app) == before
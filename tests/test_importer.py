@@ -0,0 +1,38 @@
+"""Reading BGG ranking exports."""
+
+import csv
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from webapp.importer import ranking_entries
+
+HEADER = ["id", "name", "yearpublished", "rank", "thumbnail"]
+
+
+def test_blank_rows_are_skipped():
+    rows = [HEADER, ["1", "Brass", "2018", "1", ""], [], ["", "", "", "", ""]]
+    assert list(ranking_entries(rows)) == [(1, "Brass", 2018, 1, None)]
+
+
+def test_short_row_is_reported_with_its_line():
+    rows = [HEADER, ["1", "Brass", "2018", "1", ""], ["2", "Ark Nova"]]
+    with pytest.raises(ValueError, match="Row 3"):
+        list(ranking_entries(rows))
+
+
+def test_import_of_short_row_exits_cleanly(tmp_path):
+    ranking = tmp_path / "ranking.csv"
+    with open(ranking, "w", newline="") as f:
+        csv.writer(f).writerows([HEADER, ["1", "Brass", "2018", "1", ""], ["2"]])
+    db = tmp_path / "tournament.db"
+    proc = subprocess.run(
+        [sys.executable, "-m", "webapp.importer", str(ranking), "--db", str(db), "--entrants", "2"],
+        capture_output=True, text=True, cwd=Path(__file__).parent.parent,
+    )
+    assert proc.returncode == 1
+    assert "Row 3" in proc.stderr and "Traceback" not in proc.stderr
+    assert sqlite3.connect(db).execute("SELECT COUNT(*) FROM games").fetchone() == (0,)
@@ -0,0 +1,33 @@
+"""Group commit: votes are checked again when the writer gets to them."""
+
+from conftest import ADMIN_SECRET
+from webapp.services import tallies, tournament, voting
+
+
+def test_vote_queued_before_advance_does_not_count(make_app):
+    app = make_app(VOTE_GROUP_COMMIT=True)
+    ingestor = app.extensions["vote_ingestor"]
+    with app.app_context():
+        m = tournament.get_active_matchups()[0]
+    client = app.test_client()
+    client.post(f"/matchup/{m['match_id']}/vote", json={"year": m["year_a"]})
+    client.post(f"/admin/{ADMIN_SECRET}/advance")
+    with app.app_context():
+        before = tallies.get_tallies().get(m["match_id"])
+
+    # Validated before the round closed, written after
+    assert ingestor.submit(m["match_id"], m["year_b"], "late", "203.0.113.1") == "Match is not active"
+    with app.app_context():
+        assert tallies.get_tallies().get(m["match_id"]) == before
+
+
+def test_vote_queued_before_finalizing_is_rejected(make_app):
+    app = make_app(VOTE_GROUP_COMMIT=True)
+    ingestor = app.extensions["vote_ingestor"]
+    with app.app_context():
+        m = tournament.get_active_matchups()[0]
+    with app.test_request_context():
+        voting.finalize_voter("locked-in")
+
+    assert ingestor.submit(m["match_id"], m["year_a"], "locked-in", "203.0.113.1") == "Your votes are finalised"
+    assert ingestor.submit(m["match_id"], m["year_a"], "other", "203.0.113.1") is None
@@ -0,0 +1,29 @@
+"""Live results reach only the voters of each match, and only once revealed."""
+
+from conftest import ADMIN_SECRET
+from webapp.services import tournament
+
+
+def test_live_results_only_for_own_revealed_picks(make_app):
+    app = make_app(WAVE_SIZE=2, LIVE_RESULTS_POLL_S=0)
+    with app.app_context():
+        first, second = tournament.get_active_matchups()
+    voter, other, stranger = (app.test_client() for _ in range(3))
+    voter.set_cookie("voter_id", "voter")
+    other.set_cookie("voter_id", "other")
+    voter.post(f"/matchup/{first['match_id']}/vote", json={"year": first["year_a"]})
+    other.post(f"/matchup/{first['match_id']}/vote", json={"year": first["year_b"]})
+    other.post(f"/matchup/{second['match_id']}/vote", json={"year": second["year_a"]})
+
+    assert voter.get("/live/results").json == {"results": {}}  # not revealed yet
+
+    voter.post(f"/admin/{ADMIN_SECRET}/reveal/1")
+    results = voter.get("/live/results").json["results"]
+    assert list(results) == [str(first["match_id"])]
+    assert (results[str(first["match_id"])]["votes_a"], results[str(first["match_id"])]["votes_b"]) == (1, 1)
+    assert set(other.get("/live/results").json["results"]) == {str(first["match_id"]), str(second["match_id"])}
+    assert stranger.get("/live/results").json == {"results": {}}
+
+
+def test_no_public_tally_stream(client):
+    assert client.get("/live/tallies").status_code == 404
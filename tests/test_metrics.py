@@ -0,0 +1,11 @@
+"""Request metrics and the slow-request log."""
+
+from conftest import ADMIN_SECRET
+
+
+def test_slow_request_log_hides_admin_secret(make_app, caplog):
+    client = make_app(SLOW_REQUEST_MS=0).test_client()
+    client.get(f"/admin/{ADMIN_SECRET}")
+    logged = "\n".join(r.getMessage() for r in caplog.records if "Slow request" in r.getMessage())
+    assert "GET /admin/<secret>" in logged
+    assert ADMIN_SECRET not in logged
@@ -0,0 +1,77 @@
+"""The ETag page cache: 304s while nothing changes, fresh pages once something does."""
+
+import pytest
+
+from conftest import ADMIN_SECRET
+from webapp import assets
+from webapp.services import tournament
+
+ADMIN = f"/admin/{ADMIN_SECRET}"
+PAGES = ("/", "/bracket", "/bracket/data", "/results")
+
+
+def etags(client):
+    return {path: client.get(path).headers["ETag"] for path in PAGES}
+
+
+def vote_everywhere(app, client):
+    """Vote for year_a in every active match; returns those matches."""
+    with app.app_context():
+        matchups = tournament.get_active_matchups()
+    for m in matchups:
+        assert client.post(f"/matchup/{m['match_id']}/vote", json={"year": m["year_a"]}).json["success"]
+    return matchups
+
+
+def assert_all_changed(client, before):
+    for path, etag in before.items():
+        resp = client.get(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 200, path
+        assert resp.headers["ETag"] != etag, path
+
+
+def test_unchanged_page_is_not_modified(client):
+    for path, etag in etags(client).items():
+        resp = client.get(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 304, path
+        assert resp.get_data() == b""
+
+
+def test_vote_reaches_pages_cached_before_it(app, client):
+    client.get("/results")
+    matchups = vote_everywhere(app, client)
+    assert set(client.get("/me").json["picks"]) == {str(m["match_id"]) for m in matchups}
+
+    client.post(ADMIN + "/advance")
+    client.post(ADMIN + "/reveal/1")
+    with app.app_context():
+        done = tournament.get_completed_matches(1)
+    assert {m["winner"] for m in done} == {m["year_a"] for m in matchups}
+    assert {(m["votes_a"], m["votes_b"]) for m in done} == {(1, 0)}
+    assert str(matchups[0]["year_a"]) in client.get("/results").get_data(as_text=True)
+
+
+@pytest.mark.parametrize("action", ["advance", "reveal", "reset", "set_deadline"])
+def test_state_change_invalidates_pages(app, client, action):
+    vote_everywhere(app, client)
+    if action == "reveal":
+        client.post(ADMIN + "/advance")
+    before = etags(client)
+    if action == "reveal":
+        client.post(ADMIN + "/reveal/1")
+    elif action == "set_deadline":
+        client.post(ADMIN + "/set_deadline", data={"deadline": "2999-01-01T00:00"})
+    else:
+        client.post(f"{ADMIN}/{action}")
+    assert_all_changed(client, before)
+
+
+def test_new_build_invalidates_pages(make_app, monkeypatch):
+    old = make_app().test_client()
+    same = make_app().test_client()
+    before = etags(old)
+    assert etags(same) == before
+
+    manifest = {"assets": {"css/style.css": "dist/css/style.0123abcd.css"}, "encoded": {}}
+    monkeypatch.setattr(assets, "load_manifest", lambda static_dir: manifest)
+    assert_all_changed(make_app().test_client(), before)
@@ -0,0 +1,35 @@
+"""Pages run a fixed number of SQL statements, however big the bracket is."""
+
+from flask import g
+
+from webapp.services import tournament
+
+PAGES = ("/", "/bracket", "/bracket/data", "/results", "/me")
+
+
+def statement_counts(app):
+    """{path: statements run} for the first request to each page, after voting."""
+    counts, current = {}, []
+
+    @app.teardown_appcontext
+    def record(exc):
+        stats = g.get("sql_stats")
+        if current:
+            counts.setdefault(current[-1], stats.count if stats is not None else 0)
+
+    client = app.test_client()
+    client.set_cookie("voter_id", "counting-voter")
+    with app.app_context():
+        matchups = tournament.get_active_matchups()
+    for m in matchups:
+        client.post(f"/matchup/{m['match_id']}/vote", json={"year": m["year_a"]})
+    for path in PAGES:
+        current.append(path)
+        assert client.get(path).status_code == 200
+    return counts
+
+
+def test_query_count_does_not_grow_with_bracket(make_app):
+    small = statement_counts(make_app(entrants=8, WAVE_SIZE=0))
+    large = statement_counts(make_app(entrants=128, WAVE_SIZE=0))
+    assert small == large
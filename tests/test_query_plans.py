@@ -0,0 +1,22 @@
+"""Query-plan guard (see benchmarks/query_plans.py), run on the test tournament."""
+
+import difflib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+import query_plans  # noqa: E402
+
+
+def test_no_unexpected_scans(make_app):
+    # Big enough that advancing opens another wave of round 1, as in the benchmark
+    app = make_app(entrants=32, SLOW_REQUEST_MS=float("inf"))
+    statements = query_plans.collect_statements(app)
+    report, failures = query_plans.check_plans(app.config["DATABASE"], statements)
+
+    assert not failures, "\n".join(f"FULL SCAN: {sql}" for sql, _ in failures)
+    recorded = query_plans.RECORDED.read_text()
+    assert report == recorded, "plans differ from query_plans.txt (rerun it with --update):\n" + "".join(
+        difflib.unified_diff(recorded.splitlines(True), report.splitlines(True), "recorded", "current")
+    )
@@ -0,0 +1,21 @@
+"""Per-IP rate limits behind a reverse proxy."""
+
+RATE_LIMITS = {"vote": {}, "page": {"ip": (0.01, 2)}}
+
+
+def get_from(client, ip):
+    return client.get("/bracket", environ_base={"REMOTE_ADDR": "10.0.0.1"},
+                      headers={"X-Forwarded-For": ip})
+
+
+def test_trusted_proxy_keys_buckets_on_client_ip(make_app):
+    app = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMITS=RATE_LIMITS, TRUSTED_PROXY_HOPS=1)
+    client = app.test_client()
+    assert [get_from(client, "203.0.113.1").status_code for _ in range(3)] == [200, 200, 429]
+    assert get_from(client, "203.0.113.2").status_code == 200
+
+
+def test_forwarded_for_ignored_without_trusted_proxy(make_app):
+    app = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMITS=RATE_LIMITS)
+    client = app.test_client()
+    assert [get_from(client, f"203.0.113.{i}").status_code for i in range(3)] == [200, 200, 429]
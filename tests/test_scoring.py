@@ -0,0 +1,49 @@
+"""Reseeding from the scoring CLI."""
+
+import csv
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from conftest import seed
+
+pytest.importorskip("numpy")
+
+ROOT = Path(__file__).parent.parent
+
+
+def scoring(*args):
+    return subprocess.run([sys.executable, "-m", "webapp.scoring", *args],
+                          capture_output=True, text=True, cwd=ROOT)
+
+
+def years(db_path):
+    return sqlite3.connect(db_path).execute(
+        "SELECT year, total_games, score, seed FROM years ORDER BY year"
+    ).fetchall()
+
+
+def test_write_needs_full_ranking(tmp_path):
+    db = seed(tmp_path / "tournament.db", entrants=4)
+    before = years(db)
+    proc = scoring("--db", db, "--write", "top_n_decay")
+    assert proc.returncode == 2
+    assert "--write needs --ranking" in proc.stderr
+    assert years(db) == before
+
+
+def test_write_takes_totals_from_ranking(tmp_path):
+    db = seed(tmp_path / "tournament.db", entrants=4, games_per_year=2)
+    ranking = tmp_path / "ranking.csv"
+    with open(ranking, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "yearpublished", "rank"])
+        # 1003 has many more games than the database stores for it
+        writer.writerows([n, f"Game {n}", 1003 if n <= 30 else 1000 + n % 3, n] for n in range(1, 41))
+    proc = scoring("--db", db, "--ranking", str(ranking), "--write", "top_n_decay")
+    assert proc.returncode == 0, proc.stderr
+    rows = {year: (total, seed_) for year, total, _, seed_ in years(db)}
+    assert rows[1003] == (30, 1)
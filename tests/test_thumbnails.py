@@ -0,0 +1,37 @@
+"""Local thumbnails replace BGG's image URLs on pages already cached."""
+
+import io
+import sqlite3
+
+import pytest
+
+from webapp.services import tournament
+from webapp.thumbnails import build_thumbnails
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def png(url):
+    out = io.BytesIO()
+    Image.new("RGB", (300, 200), "teal").save(out, "PNG")
+    return out.getvalue()
+
+
+def test_thumbnail_build_invalidates_game_pages(app, client, tmp_path):
+    with app.app_context():
+        match = tournament.get_active_matchups()[0]
+    pages = (f"/matchup/{match['match_id']}", f"/year/{match['year_a']}/games?page=1")
+    before = {path: client.get(path) for path in pages}
+    for resp in before.values():
+        assert "https://example.com/" in resp.get_data(as_text=True)
+
+    db = sqlite3.connect(app.config["DATABASE"])
+    stored, failures = build_thumbnails(db, png, size=64, workers=2, static_dir=tmp_path)
+    db.close()
+    assert stored and not failures
+
+    for path, old in before.items():
+        resp = client.get(path, headers={"If-None-Match": old.headers["ETag"]})
+        assert resp.status_code == 200, path
+        assert "/static/thumbs/" in resp.get_data(as_text=True)
+        assert "https://example.com/" not in resp.get_data(as_text=True)
@@ -0,0 +1,63 @@
+"""Casting votes, one at a time and in batches."""
+
+import sqlite3
+
+from webapp.services import tournament, voting
+
+
+def active(app):
+    with app.app_context():
+        return tournament.get_active_matchups()
+
+
+def batch(client, picks):
+    return client.post("/votes/batch", json={"picks": [
+        {"match_id": match_id, "year": year} for match_id, year in picks
+    ]})
+
+
+def test_batch_results_per_pick(app, client):
+    first, second, *_ = active(app)
+    resp = batch(client, [(first["match_id"], first["year_a"]), (first["match_id"], first["year_b"]),
+                          (second["match_id"], 1), (999, 1000)])
+    assert [r["success"] for r in resp.json["results"]] == [True, False, False, False]
+    assert client.get("/me").json["picks"] == {str(first["match_id"]): first["year_a"]}
+
+
+def test_batch_goes_through_group_commit(make_app, monkeypatch):
+    app = make_app(VOTE_GROUP_COMMIT=True)
+    ingestor = app.extensions["vote_ingestor"]
+    submitted = []
+    submit_many = ingestor.submit_many
+    monkeypatch.setattr(ingestor, "submit_many", lambda votes: submitted.extend(votes) or submit_many(votes))
+
+    picks = [(m["match_id"], m["year_b"]) for m in active(app)]
+    resp = batch(app.test_client(), picks)
+    assert all(r["success"] for r in resp.json["results"])
+    assert [(v[0], v[1]) for v in submitted] == picks
+
+
+def test_nothing_to_write_takes_no_write_lock(make_app):
+    app = make_app(SQLITE_BUSY_TIMEOUT_MS=50)
+    client = app.test_client()
+    client.set_cookie("voter_id", "locked-in")
+    m = active(app)[0]
+    client.post(f"/matchup/{m['match_id']}/vote", json={"year": m["year_a"]})
+    with app.test_request_context():
+        voting.finalize_voter("locked-in")
+
+    db = sqlite3.connect(app.config["DATABASE"])
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        finalized = batch(client, [(m["match_id"], m["year_b"])])
+        assert finalized.json["results"][0]["error"] == "Your votes are finalised"
+        invalid = batch(app.test_client(), [(m["match_id"], 1), (999, 1000)])
+        assert not any(r["success"] for r in invalid.json["results"])
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_startup_leaves_no_pooled_connection(make_app):
+    app = make_app()
+    assert app.extensions["sqlite_pool"]._idle == []
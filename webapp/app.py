@@ -2,14 +2,26 @@
 
 from flask import Flask
 from webapp.config import Config
-from webapp import database
+from webapp import assets, compress, database, metrics, page_cache, ratelimit
+from webapp.services import games, ingest, live, voting
 
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
 
     database.init_app(app)
+    metrics.init_app(app)
+    ratelimit.init_app(app)
+    voting.init_app(app)
+    ingest.init_app(app)
+    compress.init_app(app)
+    games.init_app(app)
+    live.init_app(app)
+    assets.init_app(app)
+    page_cache.init_app(app)
 
     from webapp.routes.vote import vote_bp
     from webapp.routes.bracket import bracket_bp
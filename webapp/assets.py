@@ -0,0 +1,289 @@
+"""Fingerprinted, minified and precompressed static assets.
+
+Usage:
+  python -m webapp.assets [--clean]
+
+Run at deploy time, after pulling and before reloading the web app. For
+each file under static/css, static/js and static/img it writes a copy to
+static/dist/ whose name carries a hash of its contents (style.css ->
+dist/css/style.1a2b3c4d5e6f.css), minifying CSS and JS first, plus .gz and,
+when the brotli package is installed, .br variants of the text files. The
+mapping goes to static/dist/manifest.json.
+
+With a manifest in place, url_for('static', filename='css/style.css')
+links the fingerprinted copy. Those are served with a one-year immutable
+Cache-Control, in the best precompressed encoding the client accepts, so
+repeat visits don't revalidate them at all. Without a manifest (or with
+FINGERPRINT_ASSETS=0) the originals are linked as before. So are they when
+a source file is newer than the manifest, e.g. a dev checkout with an old
+build: edits show up at once, and the build only needs rerunning to
+fingerprint them again.
+
+Old builds are kept, so pages rendered before a deploy still find their
+assets; --clean removes files that the new manifest doesn't reference.
+
+On PythonAnywhere, don't add a static-files mapping for /static/dist/:
+the web server would skip the encoding negotiation and cache headers.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import re
+from pathlib import Path
+
+from flask import current_app, request, send_from_directory
+
+log = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).parent / "static"
+SOURCES = ("css", "js", "img")
+DIST = "dist"
+MANIFEST = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".svg", ".json"}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Static paths whose files never change once written (thumbs: see thumbnails.py)
+IMMUTABLE_PREFIXES = (f"{DIST}/", "thumbs/")
+
+# Encodings in order of preference, with their file suffixes
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+# -- Minifiers ----------------------------------------------------------------
+
+_CSS_STRING = r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+_CSS_COMMENTS = re.compile(_CSS_STRING + r"|/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(_CSS_STRING + r"|\s+")
+_CSS_PUNCTUATION = re.compile(_CSS_STRING + r"| ?; ?(?=})| ?([{};,>]) ?|(?<=:) ")
+
+
+def minify_css(text):
+    """Drop comments and needless whitespace, leaving strings alone."""
+    css = _CSS_COMMENTS.sub(lambda m: m.group(1) or "", text)
+    css = _CSS_SPACE.sub(lambda m: m.group(1) or " ", css)
+    css = _CSS_PUNCTUATION.sub(lambda m: m.group(1) or m.group(2) or "", css)
+    return css.strip() + "\n"
+
+
+_WORD = re.compile(r"[\w$]")
+# A "/" after one of these starts a regex literal rather than a division
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^") | {""}
+_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+                   "throw", "case", "do", "else"}
+
+
+def minify_js(text):
+    """Drop comments, indentation and blank lines.
+
+    Conservative: newlines are kept (so automatic semicolon insertion
+    behaves as before) and only whitespace no token needs goes. Strings,
+    template literals and regex literals pass through untouched.
+    """
+    out, i, n = [], 0, len(text)
+    last = ""  # last significant token, for telling regexes from division
+
+    def space(newline):
+        if not out:
+            return
+        if newline:
+            if out[-1] == " ":
+                out[-1] = "\n"
+            elif out[-1] != "\n":
+                out.append("\n")
+        elif out[-1] not in (" ", "\n"):
+            out.append(" ")
+
+    while i < n:
+        c = text[i]
+        if c in " \t\r\n":
+            j = i
+            while j < n and text[j] in " \t\r\n":
+                j += 1
+            space("\n" in text[i:j])
+            i = j
+        elif text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j < 0 else j
+        elif text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            j = n if j < 0 else j + 2
+            space("\n" in text[i:j])
+            i = j
+        elif c in "'\"`" or (c == "/" and (last in _REGEX_AFTER or last in _REGEX_KEYWORDS)):
+            j, in_class = i + 1, False
+            while j < n:
+                if text[j] == "\\":
+                    j += 2
+                    continue
+                if c == "/" and text[j] == "[":
+                    in_class = True
+                elif c == "/" and text[j] == "]":
+                    in_class = False
+                elif text[j] == c and not in_class:
+                    break
+                j += 1
+            j += 1
+            if c == "/":
+                while j < n and _WORD.match(text[j]):
+                    j += 1  # flags
+            out.append(text[i:j])
+            last, i = "x", j
+        else:
+            j = i + 1
+            if _WORD.match(c):
+                while j < n and _WORD.match(text[j]):
+                    j += 1
+            out.append(text[i:j])
+            last, i = text[i:j], j
+
+    # A space is only needed between two word characters or between "+ +" / "- -"
+    for k in range(1, len(out) - 1):
+        if out[k] == " ":
+            before, after = out[k - 1][-1], out[k + 1][0]
+            keep = (_WORD.match(before) and _WORD.match(after)) or (before == after and before in "+-")
+            if not keep:
+                out[k] = ""
+    return "".join(out).strip() + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# -- Build --------------------------------------------------------------------
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not path.exists():
+        path.write_bytes(data)
+
+
+def build(static_dir=STATIC_DIR, clean=False):
+    """Write fingerprinted copies and their manifest under static/dist/; returns the manifest."""
+    static_dir = Path(static_dir)
+    dist = static_dir / DIST
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    assets, encoded = {}, {}
+    for source in SOURCES:
+        for path in sorted((static_dir / source).rglob("*")):
+            if not path.is_file():
+                continue
+            name = path.relative_to(static_dir).as_posix()
+            data = path.read_bytes()
+            if path.suffix in MINIFIERS:
+                data = MINIFIERS[path.suffix](data.decode("utf-8")).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = f"{DIST}/{Path(name).with_name(f'{path.stem}.{digest}{path.suffix}').as_posix()}"
+            _write(static_dir / hashed, data)
+            assets[name] = hashed
+
+            if path.suffix in COMPRESSIBLE:
+                variants = [("gzip", ".gz", gzip.compress(data, 9, mtime=0))]
+                if brotli:
+                    variants.insert(0, ("br", ".br", brotli.compress(data, quality=11)))
+                encoded[hashed] = []
+                for encoding, suffix, compressed in variants:
+                    if len(compressed) < len(data):
+                        _write(static_dir / (hashed + suffix), compressed)
+                        encoded[hashed].append(encoding)
+
+    manifest = {"assets": assets, "encoded": encoded}
+    dist.mkdir(parents=True, exist_ok=True)
+    tmp = dist / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    tmp.replace(dist / MANIFEST)
+
+    if clean:
+        keep = {dist / MANIFEST} | {static_dir / h for h in assets.values()}
+        keep |= {static_dir / (h + suffix) for h in encoded for _, suffix in ENCODINGS}
+        for path in dist.rglob("*"):
+            if path.is_file() and path not in keep:
+                path.unlink()
+    return manifest
+
+
+# -- Serving ------------------------------------------------------------------
+
+def load_manifest(static_dir=STATIC_DIR):
+    """The built manifest, or an empty one if there is none or it predates a source file."""
+    static_dir = Path(static_dir)
+    path = static_dir / DIST / MANIFEST
+    if not path.exists():
+        return {"assets": {}, "encoded": {}}
+    built = path.stat().st_mtime
+    newer = [p for source in SOURCES for p in (static_dir / source).rglob("*")
+             if p.is_file() and p.stat().st_mtime > built]
+    if newer:
+        log.warning("Ignoring %s: %s changed since the build (rerun python -m webapp.assets)",
+                    path, newer[0].relative_to(static_dir).as_posix())
+        return {"assets": {}, "encoded": {}}
+    return json.loads(path.read_text())
+
+
+def _fingerprint(endpoint, values):
+    if endpoint == "static":
+        hashed = current_app.extensions["assets"]["assets"].get(values.get("filename"))
+        if hashed:
+            values["filename"] = hashed
+
+
+def _precompressed(filename):
+    encodings = current_app.extensions["assets"]["encoded"].get(filename, ())
+    for encoding, suffix in ENCODINGS:
+        if encoding in encodings and request.accept_encodings[encoding]:
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response = send_from_directory(current_app.static_folder, filename + suffix,
+                                           mimetype=mimetype)
+            response.headers["Content-Encoding"] = encoding
+            return response
+    return None
+
+
+def serve_static(filename):
+    """The app's static view: send_static_file plus precompressed variants and cache headers."""
+    if not filename.startswith(IMMUTABLE_PREFIXES):
+        return current_app.send_static_file(filename)
+    response = _precompressed(filename) or current_app.send_static_file(filename)
+    if filename in current_app.extensions["assets"]["encoded"]:
+        response.vary.add("Accept-Encoding")
+    if response.status_code in (200, 304):
+        response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+def init_app(app):
+    app.extensions["assets"] = (
+        load_manifest(app.static_folder) if app.config["FINGERPRINT_ASSETS"]
+        else {"assets": {}, "encoded": {}}
+    )
+    app.url_defaults(_fingerprint)
+    app.view_functions["static"] = serve_static
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clean", action="store_true",
+                        help="remove built files the new manifest doesn't reference")
+    args = parser.parse_args()
+    manifest = build(clean=args.clean)
+    raw = sum((STATIC_DIR / name).stat().st_size for name in manifest["assets"])
+    built = sum((STATIC_DIR / hashed).stat().st_size for hashed in manifest["assets"].values())
+    print(f"Built {len(manifest['assets'])} assets into {STATIC_DIR / DIST}: "
+          f"{raw / 1024:.1f} KB -> {built / 1024:.1f} KB minified")
+    for hashed, encodings in sorted(manifest["encoded"].items()):
+        sizes = ", ".join(
+            f"{e} {(STATIC_DIR / (hashed + s)).stat().st_size / 1024:.1f} KB"
+            for e, s in ENCODINGS if e in encodings
+        )
+        print(f"  {hashed}: {(STATIC_DIR / hashed).stat().st_size / 1024:.1f} KB ({sizes})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Negotiated gzip / brotli compression for HTML and JSON responses.
+
+Responses of a compressible type (COMPRESS_MIMETYPES) and at least
+COMPRESS_MIN_BYTES long are compressed in the best encoding the client's
+Accept-Encoding allows: brotli when the brotli package is installed, else
+gzip. Streamed responses (see page_cache.render_page) are compressed chunk
+by chunk, flushing after each so the browser can start on the head of the
+page straight away. Static files are left alone; assets.py precompresses
+those at build time.
+
+Bodies with a strong ETag (the page cache's) are compressed once per
+encoding and kept, so a cache hit doesn't pay for compression either. As
+with any compressing proxy, the ETag of a compressed body is made weak;
+If-None-Match compares weakly, so revalidation still gets its 304.
+"""
+
+import gzip
+import zlib
+
+from flask import current_app, request
+from webapp.page_cache import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def negotiate():
+    """The encoding to use for this request, or None."""
+    if not current_app.config["COMPRESS_RESPONSES"]:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=current_app.config["COMPRESS_BROTLI_QUALITY"])
+    return gzip.compress(data, current_app.config["COMPRESS_LEVEL"], mtime=0)
+
+
+def compress_stream(chunks, encoding, level, quality):
+    """Compress an iterable of str/bytes chunks, flushing after each so it streams."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=quality)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip framing
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)  # noqa: E731
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def _compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in current_app.config["COMPRESS_MIMETYPES"]):
+        return response
+    if not response.is_streamed and response.content_length is not None \
+            and response.content_length < current_app.config["COMPRESS_MIN_BYTES"]:
+        return response
+    encoding = negotiate()
+    # Vary even when not compressing this time: the next client may accept it
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        config = current_app.config
+        response.response = compress_stream(
+            response.response, encoding, config["COMPRESS_LEVEL"], config["COMPRESS_BROTLI_QUALITY"]
+        )
+        response.headers.pop("Content-Length", None)
+    else:
+        etag, weak = response.get_etag()
+        cache = current_app.extensions["compress_cache"]
+        key = (etag, encoding)
+        body = cache.get(key) if etag and not weak else None
+        if body is None:
+            body = compress(response.get_data(), encoding)
+            if etag and not weak:
+                cache.put(key, body)
+        response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.extensions["compress_cache"] = LRUCache(app.config["PAGE_CACHE_ENTRIES"])
+    app.after_request(_compress_response)
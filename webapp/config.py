@@ -10,3 +10,83 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-in-production")
     DATABASE = str(BASE_DIR / "webapp" / "tournament.db")
     ADMIN_SECRET = os.environ.get("ADMIN_SECRET", "admin123")
+
+    # SQLite connection tuning, applied once per pooled connection (see database.py).
+    # WAL lets readers run alongside the single writer; set SQLITE_JOURNAL_MODE=DELETE
+    # on filesystems without shared-memory support (e.g. network mounts).
+    SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    SQLITE_CACHE_SIZE_KB = 16384
+    SQLITE_MMAP_SIZE = 64 * 1024 * 1024
+    # Idle connections kept per worker process
+    SQLITE_POOL_SIZE = 8
+
+    # Group-commit vote ingestion (see services/ingest.py). Off by default:
+    # each vote then commits on its own inside the request.
+    VOTE_GROUP_COMMIT = os.environ.get("VOTE_GROUP_COMMIT", "") == "1"
+    VOTE_BATCH_MAX_VOTES = 64
+    VOTE_BATCH_MAX_WAIT_MS = 5
+    VOTE_QUEUE_SIZE = 1024
+    # Most picks accepted by one POST /votes/batch
+    VOTE_BATCH_MAX_PICKS = 64
+
+    # Token-bucket rate limits (see ratelimit.py): per scope, per IP and per
+    # voter_id cookie, as (requests per second, burst). Per worker process.
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") != "0"
+    RATE_LIMITS = {
+        "vote": {"ip": (5, 30), "voter": (2, 10)},
+        "page": {"ip": (20, 100), "voter": (10, 50)},
+    }
+    # Keys tracked per set of buckets; the least recently seen are dropped first
+    RATE_LIMIT_MAX_KEYS = 50_000
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted for
+    # the client IP (the per-IP buckets, and the IP stored with each vote).
+    # 0 uses the socket peer address; wsgi.py sets 1 for PythonAnywhere.
+    TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+
+    # Matches open at once in a round (see tournament.advance_round). Rounds
+    # with more matches are played in waves; 0 opens the whole round at once.
+    WAVE_SIZE = 4
+    # Per-round overrides of WAVE_SIZE, e.g. {1: 16, 2: 8}
+    ROUND_WAVE_SIZES = {}
+
+    # Rendered pages kept by the ETag page cache (see page_cache.py)
+    PAGE_CACHE_ENTRIES = 256
+
+    # Years whose sorted game lists are kept in memory (see services/games.py)
+    GAMES_CACHE_YEARS = 256
+    # Rendered pages of game tiles kept for /year/<year>/games, across all years
+    GAMES_CACHE_PAGES = 512
+    # Game tiles per year rendered into a matchup page; the rest load on scroll
+    GAMES_PAGE_SIZE = 24
+
+    # Response compression (see compress.py); brotli needs the brotli package
+    COMPRESS_RESPONSES = True
+    COMPRESS_MIMETYPES = ("text/html", "application/json")
+    COMPRESS_MIN_BYTES = 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
+    # Stream large pages (bracket, results) as they render (see page_cache.render_page)
+    STREAM_PAGES = True
+    STREAM_CHUNK_BYTES = 16384
+
+    # Static files: link the fingerprinted copies from `python -m webapp.assets`, if built
+    FINGERPRINT_ASSETS = os.environ.get("FINGERPRINT_ASSETS", "1") != "0"
+    # Edge in pixels of the local game thumbnails, 2x the card width (see thumbnails.py)
+    THUMBNAIL_SIZE = 240
+    # Rows read per batch by the streaming vote export (see services/export.py)
+    EXPORT_FETCH_ROWS = 1000
+
+    # Live tally streams for the admin dashboard (see services/live.py). Each
+    # open stream holds a worker, so keep this well under the worker count.
+    LIVE_POLL_INTERVAL_S = 2
+    LIVE_MAX_SUBSCRIBERS = 2
+    LIVE_STREAM_MAX_S = 300
+    # Seconds between voters' polls of /live/results, and how long its counts are reused
+    LIVE_RESULTS_POLL_S = 10
+
+    # Log requests slower than this (ms) with the SQL they ran; None disables
+    SLOW_REQUEST_MS = (
+        float(os.environ["SLOW_REQUEST_MS"]) if os.environ.get("SLOW_REQUEST_MS") else None
+    )
@@ -1,83 +1,339 @@
 """SQLite database setup and helpers."""
 
+import os
 import sqlite3
+import threading
+import time
 from flask import g, current_app
 
-SCHEMA = """
-CREATE TABLE IF NOT EXISTS years (
-    year INTEGER PRIMARY KEY,
-    total_games INTEGER NOT NULL,
-    top500_games INTEGER NOT NULL,
-    score REAL NOT NULL,
-    seed INTEGER NOT NULL UNIQUE
-);
-
-CREATE TABLE IF NOT EXISTS games (
-    game_id INTEGER PRIMARY KEY,
-    name TEXT NOT NULL,
-    year_published INTEGER NOT NULL REFERENCES years(year),
-    rank INTEGER NOT NULL,
-    thumbnail_url TEXT
-);
-
-CREATE TABLE IF NOT EXISTS matches (
-    match_id INTEGER PRIMARY KEY,
-    round INTEGER NOT NULL,
-    position INTEGER NOT NULL,
-    year_a INTEGER REFERENCES years(year),
-    year_b INTEGER REFERENCES years(year),
-    winner INTEGER REFERENCES years(year),
-    next_match_id INTEGER REFERENCES matches(match_id),
-    is_active INTEGER NOT NULL DEFAULT 0,
-    UNIQUE(round, position)
-);
-
-CREATE TABLE IF NOT EXISTS votes (
-    vote_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    match_id INTEGER NOT NULL REFERENCES matches(match_id),
-    voted_for INTEGER NOT NULL REFERENCES years(year),
-    voter_id TEXT NOT NULL,
-    voted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    ip_address TEXT,
-    UNIQUE(match_id, voter_id)
-);
-
-CREATE TABLE IF NOT EXISTS tournament_state (
-    key TEXT PRIMARY KEY,
-    value TEXT NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS voter_finalizations (
-    voter_id TEXT PRIMARY KEY,
-    finalized_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-"""
+# Recomputes year_stats from games; run by migration 5 and after every import
+REBUILD_YEAR_STATS = [
+    "DELETE FROM year_stats",
+    """INSERT INTO year_stats (year, game_count, top_25, top_100, top_200, top_500,
+                               best_rank, median_rank)
+       WITH ranked AS (
+           SELECT year_published AS year, rank,
+                  ROW_NUMBER() OVER (PARTITION BY year_published ORDER BY rank) AS n,
+                  COUNT(*) OVER (PARTITION BY year_published) AS c
+           FROM games
+       )
+       SELECT year, MAX(c), SUM(rank <= 25), SUM(rank <= 100), SUM(rank <= 200),
+              SUM(rank <= 500), MIN(rank),
+              AVG(CASE WHEN n IN ((c + 1) / 2, (c + 2) / 2) THEN rank END)
+       FROM ranked GROUP BY year""",
+]
+
+# Schema migrations, applied in order inside one write transaction.
+# PRAGMA user_version records how many have run, so once a database is
+# current, startup costs a single header read. Statements use IF NOT EXISTS
+# because databases from before versioning (user_version 0) may already have
+# some of these objects; existing rows are never touched.
+MIGRATIONS = [
+    # 1: the original tables
+    [
+        """CREATE TABLE IF NOT EXISTS years (
+            year INTEGER PRIMARY KEY,
+            total_games INTEGER NOT NULL,
+            top500_games INTEGER NOT NULL,
+            score REAL NOT NULL,
+            seed INTEGER NOT NULL UNIQUE
+        )""",
+        """CREATE TABLE IF NOT EXISTS games (
+            game_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            year_published INTEGER NOT NULL REFERENCES years(year),
+            rank INTEGER NOT NULL,
+            thumbnail_url TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS matches (
+            match_id INTEGER PRIMARY KEY,
+            round INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            year_a INTEGER REFERENCES years(year),
+            year_b INTEGER REFERENCES years(year),
+            winner INTEGER REFERENCES years(year),
+            next_match_id INTEGER REFERENCES matches(match_id),
+            is_active INTEGER NOT NULL DEFAULT 0,
+            UNIQUE(round, position)
+        )""",
+        """CREATE TABLE IF NOT EXISTS votes (
+            vote_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL REFERENCES matches(match_id),
+            voted_for INTEGER NOT NULL REFERENCES years(year),
+            voter_id TEXT NOT NULL,
+            voted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ip_address TEXT,
+            UNIQUE(match_id, voter_id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS tournament_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS voter_finalizations (
+            voter_id TEXT PRIMARY KEY,
+            finalized_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ],
+    # 2: materialized vote counts (see services/tallies.py), backfilled from votes
+    [
+        """CREATE TABLE IF NOT EXISTS vote_tallies (
+            match_id INTEGER NOT NULL REFERENCES matches(match_id),
+            year INTEGER NOT NULL REFERENCES years(year),
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (match_id, year)
+        )""",
+        """INSERT INTO vote_tallies (match_id, year, count)
+           SELECT match_id, voted_for, COUNT(*) FROM votes
+           WHERE NOT EXISTS (SELECT 1 FROM vote_tallies)
+           GROUP BY match_id, voted_for""",
+    ],
+    # 3: indexes for the hot queries
+    [
+        # One voter's picks (voting.get_voter_context) and COUNT(DISTINCT voter_id)
+        "CREATE INDEX IF NOT EXISTS idx_votes_voter ON votes(voter_id, match_id, voted_for)",
+        # Per-match counts: results, reconcile_tallies, the advance fallback
+        "CREATE INDEX IF NOT EXISTS idx_votes_match ON votes(match_id, voted_for)",
+        # Active / completed matches of a round
+        "CREATE INDEX IF NOT EXISTS idx_matches_round ON matches(round, is_active, winner)",
+        # A year's games in rank order (matchup pages)
+        "CREATE INDEX IF NOT EXISTS idx_games_year ON games(year_published, rank)",
+    ],
+    # 4: feeder lookups when advance_round fills next-round slots
+    [
+        "CREATE INDEX IF NOT EXISTS idx_matches_next ON matches(next_match_id, position)",
+    ],
+    # 5: per-year game statistics for the matchup pages (see services/games.py)
+    [
+        """CREATE TABLE IF NOT EXISTS year_stats (
+            year INTEGER PRIMARY KEY REFERENCES years(year),
+            game_count INTEGER NOT NULL,
+            top_25 INTEGER NOT NULL,
+            top_100 INTEGER NOT NULL,
+            top_200 INTEGER NOT NULL,
+            top_500 INTEGER NOT NULL,
+            best_rank INTEGER,
+            median_rank REAL
+        )""",
+        *REBUILD_YEAR_STATS,
+    ],
+    # 6: local copies of game thumbnails (see thumbnails.py)
+    [
+        """CREATE TABLE IF NOT EXISTS thumbnails (
+            source_url TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ],
+]
+
+
+class QueryStats:
+    """SQL work done by one request: statement count, time, slowest, commits."""
+
+    def __init__(self, keep_statements=False):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = None
+        self.commit_time = 0.0
+        # (sql, ms) pairs, only kept when the slow-request log is on
+        self.statements = [] if keep_statements else None
+
+    def record(self, sql, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.slowest:
+            self.slowest, self.slowest_sql = elapsed, sql
+        if self.statements is not None:
+            self.statements.append((" ".join(sql.split()), elapsed * 1000))
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection that reports its statements to `stats` while one is set.
+
+    Times cover execute() itself, which runs the statement up to its first
+    row; rows fetched afterwards are not included.
+    """
+
+    stats = None
+
+    def _timed(self, method, sql, *args):
+        stats = self.stats
+        if stats is None:
+            return method(sql, *args)
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            stats.record(sql, time.perf_counter() - start)
+
+    def execute(self, sql, *args):
+        return self._timed(super().execute, sql, *args)
+
+    def executemany(self, sql, *args):
+        return self._timed(super().executemany, sql, *args)
+
+    def executescript(self, sql):
+        return self._timed(super().executescript, sql)
+
+    def commit(self):
+        stats = self.stats
+        if stats is None:
+            return super().commit()
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            stats.commit_time += time.perf_counter() - start
+
+
+class ConnectionPool:
+    """Per-process pool of tuned SQLite connections, reused across requests.
+
+    Each request checks one connection out and returns it at teardown, so
+    pragmas are paid once per connection rather than once per request. This
+    works for thread-per-request servers (Flask's dev server) as well as
+    thread pools, since connections are not tied to the thread that opened
+    them. Connections are never shared between processes: a pool inherited
+    across fork (pre-forking WSGI servers) is dropped and rebuilt.
+    """
+
+    def __init__(self, config):
+        self.path = config["DATABASE"]
+        self.size = config["SQLITE_POOL_SIZE"]
+        self.pragmas = [
+            "PRAGMA foreign_keys = ON",
+            f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+            f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+            # Negative cache_size is in KiB rather than pages
+            f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}",
+            f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+        ]
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Inherited connections are abandoned, not closed: closing a handle
+        # that another process also holds can release that process's locks.
+        self._pid = os.getpid()
+        self._idle = []
+        self._file_id = None
+
+    def _current_file_id(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            factory=InstrumentedConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            # If the database file was swapped out (e.g. a fresh tournament.db
+            # deployed), pooled connections still point at the old inode.
+            file_id = self._current_file_id()
+            if file_id != self._file_id:
+                stale, self._idle = self._idle, []
+                self._file_id = file_id
+            else:
+                stale = []
+            conn = self._idle.pop() if self._idle else None
+        for old in stale:
+            old.close()
+        return conn if conn is not None else self.connect()
+
+    def release(self, conn, error=None):
+        """Return a connection to the pool, discarding it if it looks broken."""
+        healthy = not isinstance(error, sqlite3.DatabaseError) or isinstance(
+            error, sqlite3.IntegrityError
+        )
+        if healthy:
+            try:
+                # Never hand out a connection with someone else's open transaction
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                healthy = False
+        with self._lock:
+            if healthy and self._pid == os.getpid() and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        if self._pid == os.getpid():
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+def get_pool(app=None):
+    app = app or current_app
+    return app.extensions["sqlite_pool"]
 
 
 def get_db():
     if "db" not in g:
-        g.db = sqlite3.connect(
-            current_app.config["DATABASE"],
-            detect_types=sqlite3.PARSE_DECLTYPES,
+        g.db = get_pool().acquire()
+        g.db.stats = g.sql_stats = QueryStats(
+            keep_statements=current_app.config["SLOW_REQUEST_MS"] is not None
         )
-        g.db.row_factory = sqlite3.Row
-        g.db.execute("PRAGMA foreign_keys = ON")
     return g.db
 
 
 def close_db(e=None):
     db = g.pop("db", None)
     if db is not None:
-        db.close()
+        db.stats = None
+        get_pool().release(db, e)
+
+
+def migrate(db):
+    """Bring the database up to the latest schema version; returns the old version."""
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(MIGRATIONS):
+        return version
+    # Another worker may be migrating too: take the write lock, then re-check
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for sql in statements:
+                db.execute(sql)
+            db.execute(f"PRAGMA user_version = {number}")
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return version
 
 
 def init_db():
-    db = get_db()
-    db.executescript(SCHEMA)
-    db.commit()
+    # Run on a throwaway connection so the parent of a pre-forking server
+    # does not hold one open across fork.
+    db = get_pool().connect()
+    try:
+        mode = current_app.config["SQLITE_JOURNAL_MODE"]
+        # journal_mode is persistent in the database file, so set it once here
+        db.execute(f"PRAGMA journal_mode = {mode}")
+        migrate(db)
+    finally:
+        db.close()
 
 
 def init_app(app):
+    app.extensions["sqlite_pool"] = ConnectionPool(app.config)
     app.teardown_appcontext(close_db)
     with app.app_context():
         init_db()
@@ -0,0 +1,277 @@
+"""Build a tournament from a BGG ranking export.
+
+Usage:
+  python -m webapp.importer RANKING.(csv|xlsx) [--db PATH] [--entrants 32]
+                            [--max-rank 1000] [--replace]
+
+Streams the export row by row (CSV, or xlsx through openpyxl's read-only
+mode) and, in one transaction, rebuilds the tournament from it:
+
+- games ranked within --max-rank are bulk-inserted with executemany, for
+  the matchup pages;
+- every ranked game counts towards its year's total_games, top500_games
+  and score, so only a handful of numbers per year are held in memory;
+- the best --entrants years (a power of two) are seeded by score;
+- the full bracket is generated, with 1 and 2 only able to meet in the
+  final, and the first wave of round 1 is opened.
+
+Games of years that didn't make the bracket are dropped, as are any votes
+and tournament progress. An existing tournament with votes is only
+replaced when --replace is given.
+"""
+
+import argparse
+import csv
+import sqlite3
+import time
+from pathlib import Path
+
+from webapp.config import Config
+from webapp.database import REBUILD_YEAR_STATS, migrate
+
+# Header aliases, compared lowercased with spaces and underscores removed
+COLUMNS = {
+    "game_id": ("id", "gameid", "bggid", "objectid"),
+    "name": ("name", "primaryname", "title"),
+    "year": ("yearpublished", "year", "published"),
+    "rank": ("rank", "bggrank", "boardgamerank"),
+    "thumbnail_url": ("thumbnail", "thumbnailurl", "image"),
+    "is_expansion": ("isexpansion", "expansion"),
+}
+REQUIRED = ("game_id", "name", "year", "rank")
+
+# Score points for a game by rank: (up to rank, points); ranked beyond all tiers scores 1
+RANK_POINTS = ((100, 6), (250, 5), (500, 4), (1000, 3))
+
+
+def rank_points(rank):
+    for limit, points in RANK_POINTS:
+        if rank <= limit:
+            return points
+    return 1
+
+
+def read_rows(path):
+    """Yield the export's rows as tuples, the header row first."""
+    path = Path(path)
+    if path.suffix.lower() in (".xlsx", ".xlsm"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise SystemExit("Reading .xlsx needs openpyxl (pip install openpyxl)")
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+
+
+def _column_map(header):
+    normalized = [str(h or "").strip().lower().replace(" ", "").replace("_", "") for h in header]
+    found = {}
+    for field, aliases in COLUMNS.items():
+        for alias in aliases:
+            if alias in normalized:
+                found[field] = normalized.index(alias)
+                break
+    missing = [f for f in REQUIRED if f not in found]
+    if missing:
+        raise ValueError(f"Ranking export has no column for: {', '.join(missing)}")
+    return found
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def ranking_entries(rows):
+    """Yield (game_id, name, year, rank, thumbnail_url) for every ranked game in `rows`.
+
+    The first row must be the header. Unranked games (blank, 0 or "Not
+    Ranked"), undated ones, expansions and blank rows are skipped; a row too
+    short to hold every column raises ValueError.
+    """
+    rows = iter(rows)
+    cols = _column_map(next(rows))
+    thumb, expansion = cols.get("thumbnail_url"), cols.get("is_expansion")
+    width = max(cols.values()) + 1
+    for line, row in enumerate(rows, start=2):
+        if len(row) < width:
+            if not any(str(cell or "").strip() for cell in row):
+                continue
+            raise ValueError(f"Row {line} of the ranking export has {len(row)} columns, expected {width}")
+        rank, year = _int(row[cols["rank"]]), _int(row[cols["year"]])
+        if not rank or not year or (expansion is not None and _int(row[expansion])):
+            continue
+        yield (
+            _int(row[cols["game_id"]]),
+            str(row[cols["name"]]).strip(),
+            year,
+            rank,
+            (row[thumb] or None) if thumb is not None else None,
+        )
+
+
+def ranked_games(rows, year_stats, max_rank):
+    """Yield game rows to store, tallying every ranked game into `year_stats`.
+
+    `year_stats` maps year -> [total_games, top500_games, score] and is
+    filled as the rows stream past.
+    """
+    for game in ranking_entries(rows):
+        year, rank = game[2], game[3]
+        stats = year_stats.setdefault(year, [0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += rank <= 500
+        stats[2] += rank_points(rank)
+        if rank <= max_rank:
+            yield game
+
+
+def bracket_order(size):
+    """Seeds in round-1 slot order, so the top seeds meet as late as possible."""
+    order = [1, 2]
+    while len(order) < size:
+        n = len(order) * 2
+        order = [seed for s in order for seed in (s, n + 1 - s)]
+    return order[:size]
+
+
+def create_bracket(db, years_by_seed, wave_size):
+    """Insert the matches tree for `years_by_seed` (best first) and open the first wave.
+
+    Match ids run round by round in position order; each match feeds the
+    next-round match at position (p + 1) // 2.
+    """
+    size = len(years_by_seed)
+    if size < 2 or size & (size - 1):
+        raise ValueError(f"Bracket size must be a power of two, got {size}")
+    order = bracket_order(size)
+    rows, match_id, round_num, count = [], 1, 1, size // 2
+    while count:
+        next_first = match_id + count
+        for pos in range(1, count + 1):
+            year_a = year_b = None
+            if round_num == 1:
+                year_a = years_by_seed[order[2 * pos - 2] - 1]
+                year_b = years_by_seed[order[2 * pos - 1] - 1]
+            next_id = next_first + (pos - 1) // 2 if count > 1 else None
+            active = round_num == 1 and (not wave_size or pos <= wave_size)
+            rows.append((match_id, round_num, pos, year_a, year_b, next_id, int(active)))
+            match_id += 1
+        round_num, count = round_num + 1, count // 2
+    db.executemany(
+        "INSERT INTO matches (match_id, round, position, year_a, year_b, next_match_id, is_active)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    return len(rows)
+
+
+def restart_tournament(db, years_by_seed, wave_size=None):
+    """Drop all votes and progress and lay out a fresh bracket. Returns the match count.
+
+    Doesn't commit; callers run it inside their own transaction.
+    """
+    if wave_size is None:
+        wave_size = Config.ROUND_WAVE_SIZES.get(1, Config.WAVE_SIZE)
+    for table in ("votes", "vote_tallies", "voter_finalizations", "matches"):
+        db.execute(f"DELETE FROM {table}")
+    db.execute("DELETE FROM tournament_state WHERE key IN ('results_revealed', 'current_round')")
+    db.execute("INSERT INTO tournament_state (key, value) VALUES ('current_round', '1')")
+    matches = create_bracket(db, years_by_seed, wave_size)
+    # Same bump as state.bump_version(), so running workers drop cached pages
+    db.execute(
+        "INSERT INTO tournament_state (key, value) VALUES ('state_version', '1') "
+        "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+    return matches
+
+
+def import_ranking(db, rows, entrants=32, max_rank=1000, wave_size=None):
+    """Replace years, games, matches and all progress with a tournament built from `rows`.
+
+    Runs in one transaction; returns a summary dict.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        db.execute("DELETE FROM games")
+        db.execute("DELETE FROM years")
+        year_stats = {}
+        db.executemany(
+            "INSERT INTO games (game_id, name, year_published, rank, thumbnail_url)"
+            " VALUES (?, ?, ?, ?, ?)",
+            ranked_games(rows, year_stats, max_rank),
+        )
+        if len(year_stats) < entrants:
+            raise ValueError(f"Only {len(year_stats)} years have ranked games; "
+                             f"can't fill a bracket of {entrants}")
+
+        # Best score first; more top-500 games, then more games, break ties
+        ranked = sorted(year_stats.items(), key=lambda kv: (-kv[1][2], -kv[1][1], -kv[1][0], kv[0]))
+        chosen = ranked[:entrants]
+        db.executemany(
+            "INSERT INTO years (year, total_games, top500_games, score, seed) VALUES (?, ?, ?, ?, ?)",
+            ((year, total, top500, score, seed)
+             for seed, (year, (total, top500, score)) in enumerate(chosen, start=1)),
+        )
+        db.execute("DELETE FROM games WHERE year_published NOT IN (SELECT year FROM years)")
+        games = db.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+        for sql in REBUILD_YEAR_STATS:
+            db.execute(sql)
+        # Tells running workers their cached game lists are stale (see services/games.py)
+        db.execute(
+            "INSERT INTO tournament_state (key, value) VALUES ('games_version', '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+        matches = restart_tournament(db, [year for year, _ in chosen], wave_size)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return {
+        "years_seen": len(year_stats),
+        "ranked_games": sum(s[0] for s in year_stats.values()),
+        "games": games,
+        "entrants": entrants,
+        "matches": matches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ranking", help="BGG ranking export, .csv or .xlsx")
+    parser.add_argument("--db", default=Config.DATABASE, help="tournament database to (re)build")
+    parser.add_argument("--entrants", type=int, default=32, help="bracket size, a power of two")
+    parser.add_argument("--max-rank", type=int, default=1000,
+                        help="store games ranked this high or better for the matchup pages")
+    parser.add_argument("--replace", action="store_true",
+                        help="replace a tournament that already has votes")
+    args = parser.parse_args()
+
+    db = sqlite3.connect(args.db)
+    try:
+        migrate(db)
+        votes = db.execute("SELECT COUNT(*) FROM votes").fetchone()[0]
+        if votes and not args.replace:
+            raise SystemExit(f"{args.db} already has {votes} votes; pass --replace to discard them")
+        start = time.perf_counter()
+        summary = import_ranking(db, read_rows(args.ranking), args.entrants, args.max_rank)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    finally:
+        db.close()
+    print(f"Read {summary['ranked_games']} ranked games across {summary['years_seen']} years "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(f"Seeded {summary['entrants']} years, stored {summary['games']} games, "
+          f"created {summary['matches']} matches in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Request and SQL metrics, exposed in Prometheus text format.
+
+Per-request SQL statistics come from the instrumented connection in
+database.py. After each request they feed the histograms below. In debug
+mode they are also sent back as X-SQL-* response headers, and with
+SLOW_REQUEST_MS set, slow requests are logged with the statements they ran.
+
+Metrics are kept per process; with several WSGI workers each one reports
+its own numbers.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request, current_app
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._labels(key)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{self._labels(key, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_sum{self._labels(key)} {total}"
+            yield f"{self.name}_count{self._labels(key)} {cumulative}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = []
+
+http_requests = Counter(
+    "bgby_http_requests_total", "HTTP requests by endpoint and status.", ["endpoint", "status"]
+)
+http_duration = Histogram(
+    "bgby_http_request_duration_seconds", "Request handling time.", ["endpoint"]
+)
+sql_queries = Histogram(
+    "bgby_sql_queries_per_request", "SQL statements run per request.", ["endpoint"],
+    buckets=COUNT_BUCKETS,
+)
+sql_time = Histogram(
+    "bgby_sql_time_seconds", "Time spent in SQL per request.", ["endpoint"]
+)
+sql_commit_time = Histogram(
+    "bgby_sql_commit_seconds", "Time spent committing (fsync) per request.", ["endpoint"]
+)
+votes_cast = Counter("bgby_votes_cast_total", "Vote submissions by outcome.", ["result"])
+advance_duration = Histogram("bgby_advance_round_seconds", "Time to advance a wave or round.")
+page_cache_requests = Counter(
+    "bgby_page_cache_requests_total", "Page cache lookups by outcome.", ["result"]
+)
+rate_limit_requests = Counter(
+    "bgby_rate_limit_requests_total", "Rate-limited route requests by scope and outcome.",
+    ["scope", "result"],
+)
+rate_limit_evictions = Counter(
+    "bgby_rate_limit_evictions_total", "Token buckets dropped to stay within RATE_LIMIT_MAX_KEYS.",
+    ["buckets"],
+)
+
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def _before_request():
+    g.request_start = time.perf_counter()
+
+
+def _after_request(resp):
+    start = g.get("request_start")
+    if start is None:
+        return resp
+    elapsed = time.perf_counter() - start
+    endpoint = request.endpoint or "unknown"
+    http_requests.inc(endpoint=endpoint, status=resp.status_code)
+    http_duration.observe(elapsed, endpoint=endpoint)
+
+    stats = g.get("sql_stats")
+    if stats is not None:
+        sql_queries.observe(stats.count, endpoint=endpoint)
+        sql_time.observe(stats.total, endpoint=endpoint)
+        if stats.commit_time:
+            sql_commit_time.observe(stats.commit_time, endpoint=endpoint)
+        if current_app.debug:
+            resp.headers["X-SQL-Queries"] = str(stats.count)
+            resp.headers["X-SQL-Time-ms"] = f"{stats.total * 1000:.2f}"
+            resp.headers["X-SQL-Commit-ms"] = f"{stats.commit_time * 1000:.2f}"
+            resp.headers["X-SQL-Slowest-ms"] = f"{stats.slowest * 1000:.2f}"
+
+    slow_ms = current_app.config["SLOW_REQUEST_MS"]
+    if slow_ms is not None and elapsed * 1000 >= slow_ms:
+        statements = stats.statements if stats is not None else []
+        # The route pattern, not the path: admin paths carry the secret
+        route = request.url_rule.rule if request.url_rule else endpoint
+        current_app.logger.warning(
+            "Slow request %s %s: %.1f ms, %d statements\n%s",
+            request.method, route, elapsed * 1000, len(statements),
+            "\n".join(f"  {ms:8.2f} ms  {sql}" for sql, ms in statements),
+        )
+    return resp
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,141 @@
+"""Rendered-page cache with strong ETags for pages that rarely change.
+
+Pages are keyed on the tournament state version (bumped by every advance,
+reveal, reset and deadline change — see services/state.py), the games
+version (bumped by imports and thumbnail builds, which change the game
+tiles and their image URLs), a fingerprint
+of the templates and asset manifest this process was started with (so a
+deploy invalidates pages browsers hold), plus any per-voter parts the
+caller supplies. The ETag is derived from that key, so
+a matching If-None-Match is answered with 304 before anything is rendered,
+and a miss renders once and serves the stored body until the version moves.
+
+Large pages can be rendered with render_page, which streams the template
+when STREAM_PAGES is on: a miss then sends the page as it renders and
+stores the body once the last chunk has gone out.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from flask import current_app, make_response, render_template, request, stream_template
+from webapp import metrics
+from webapp.services.state import get_state
+
+
+class LRUCache:
+    """A small thread-safe LRU, used for pages and for per-year game lists."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def page_etag(name, parts=()):
+    """Strong ETag for page `name` at the current tournament and games versions."""
+    state = get_state()
+    build = current_app.extensions["page_build"]
+    key = repr((name, state.version, state.games_version, build, tuple(parts)))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def cached_response(name, render, parts=(), private=False):
+    """Serve `render()` through the page cache, honouring If-None-Match.
+
+    `render` returns a response (or anything make_response accepts) and is
+    only called on a cache miss. `parts` distinguishes variants of the same
+    page, e.g. a digest of the voter's picks; pages with per-voter parts
+    should pass private=True so shared caches don't store them.
+    """
+    etag = page_etag(name, parts)
+    # Weak comparison, as If-None-Match specifies: compress.py weakens the ETag
+    if request.if_none_match.contains_weak(etag):
+        metrics.page_cache_requests.inc(result="not_modified")
+        resp = current_app.response_class(status=304)
+    else:
+        cache = current_app.extensions["page_cache"]
+        entry = cache.get(etag)
+        metrics.page_cache_requests.inc(result="hit" if entry else "miss")
+        if entry is None:
+            rendered = make_response(render())
+            if rendered.is_streamed:
+                resp = current_app.response_class(
+                    _store_when_sent(cache, etag, rendered.response, rendered.mimetype,
+                                     current_app.config["STREAM_CHUNK_BYTES"]),
+                    mimetype=rendered.mimetype,
+                )
+            else:
+                entry = (rendered.get_data(), rendered.mimetype)
+                cache.put(etag, entry)
+        if entry is not None:
+            resp = current_app.response_class(entry[0], mimetype=entry[1])
+
+    resp.set_etag(etag)
+    # Always revalidate: the ETag makes that a cheap 304 while nothing changed
+    resp.headers["Cache-Control"] = ("private" if private else "public") + ", no-cache"
+    return resp
+
+
+def _store_when_sent(cache, key, chunks, mimetype, chunk_size):
+    # Template streams yield many tiny strings; send them in chunk_size pieces.
+    # Runs after the view has returned, so it mustn't touch the app context.
+    body, pending, pending_size = [], [], 0
+    for chunk in chunks:
+        chunk = chunk.encode() if isinstance(chunk, str) else chunk
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= chunk_size:
+            data = b"".join(pending)
+            body.append(data)
+            pending, pending_size = [], 0
+            yield data
+    data = b"".join(pending)
+    body.append(data)
+    yield data
+    cache.put(key, (b"".join(body), mimetype))
+
+
+def render_page(template, **context):
+    """render_template, or stream_template when STREAM_PAGES is on.
+
+    Meant as the return value of a cached_response render function.
+    """
+    if current_app.config["STREAM_PAGES"]:
+        return stream_template(template, **context)
+    return render_template(template, **context)
+
+
+def build_fingerprint(app):
+    """Digest of the templates and asset manifest pages are rendered with."""
+    digest = hashlib.sha1()
+    templates = Path(app.root_path, app.template_folder)
+    for path in sorted(templates.rglob("*")):
+        if path.is_file():
+            digest.update(str(path.relative_to(templates)).encode())
+            digest.update(path.read_bytes())
+    digest.update(json.dumps(app.extensions["assets"], sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def init_app(app):
+    # After assets.init_app: the fingerprint covers the loaded manifest
+    app.extensions["page_build"] = build_fingerprint(app)
+    app.extensions["page_cache"] = LRUCache(app.config["PAGE_CACHE_ENTRIES"])
@@ -0,0 +1,107 @@
+"""Per-IP and per-voter rate limiting for the vote and page routes.
+
+Each (scope, key type) pair in RATE_LIMITS gets its own set of token
+buckets: "vote" covers the vote submission endpoints, "page" everything
+else public. A request is checked against the IP's bucket and, when it
+carries a voter_id cookie, the voter's bucket too, in a before_request hook
+that runs ahead of any database work; an empty bucket means an immediate
+429 with Retry-After. Minting a new voter_id only gets a client a fresh
+voter bucket, never a fresh IP one.
+
+Buckets are stored GCRA-style, as the single float at which the bucket
+would be full again, in an LRU bounded by RATE_LIMIT_MAX_KEYS. Like the
+other in-process caches they are per worker process, so the effective limit
+is the configured one times the number of workers. The IP is
+request.remote_addr, as recorded with each vote. Behind a reverse proxy
+that would be the proxy's own address, putting every voter in one bucket,
+so with TRUSTED_PROXY_HOPS set the app is wrapped in werkzeug's ProxyFix
+and the client IP is taken from that many X-Forwarded-For entries.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from webapp import metrics
+
+VOTE_ENDPOINTS = {"vote.submit_vote", "vote.submit_votes"}
+PAGE_BLUEPRINTS = {"vote", "bracket"}
+
+
+class TokenBuckets:
+    """Token buckets of `burst` tokens refilling at `rate` per second, one per key."""
+
+    def __init__(self, rate, burst, max_keys, name=""):
+        self.interval = 1 / rate
+        self.capacity = burst * self.interval
+        self.max_keys = max_keys
+        self.name = name
+        self._full_at = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, now=None):
+        """Take a token for `key`: 0 if there was one, else seconds until there is."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            full_at = max(self._full_at.get(key, now), now) + self.interval
+            wait = full_at - now - self.capacity
+            if wait > 0:
+                return wait
+            self._full_at[key] = full_at
+            self._full_at.move_to_end(key)
+            while len(self._full_at) > self.max_keys:
+                self._full_at.popitem(last=False)
+                metrics.rate_limit_evictions.inc(buckets=self.name)
+            return 0
+
+    def __len__(self):
+        return len(self._full_at)
+
+
+def _scope():
+    if request.endpoint in VOTE_ENDPOINTS:
+        return "vote"
+    if request.blueprint in PAGE_BLUEPRINTS:
+        return "page"
+    return None
+
+
+def _check_rate_limit():
+    scope = _scope()
+    if scope is None:
+        return None
+    buckets = current_app.extensions["rate_limiter"][scope]
+    keys = {"ip": request.remote_addr, "voter": request.cookies.get("voter_id")}
+    for kind, limiter in buckets.items():
+        if keys[kind] is None:
+            continue
+        wait = limiter.take(keys[kind])
+        if wait:
+            metrics.rate_limit_requests.inc(scope=scope, result=f"limited_{kind}")
+            if scope == "vote":
+                resp = jsonify({"success": False, "error": "Too many requests, please slow down"})
+            else:
+                resp = current_app.response_class("Too many requests", mimetype="text/plain")
+            resp.status_code = 429
+            resp.headers["Retry-After"] = str(math.ceil(wait))
+            return resp
+    metrics.rate_limit_requests.inc(scope=scope, result="allowed")
+    return None
+
+
+def init_app(app):
+    if app.config["TRUSTED_PROXY_HOPS"]:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["TRUSTED_PROXY_HOPS"])
+    max_keys = app.config["RATE_LIMIT_MAX_KEYS"]
+    app.extensions["rate_limiter"] = {
+        scope: {
+            kind: TokenBuckets(rate, burst, max_keys, name=f"{scope}_{kind}")
+            for kind, (rate, burst) in limits.items()
+        }
+        for scope, limits in app.config["RATE_LIMITS"].items()
+    }
+    if app.config["RATE_LIMIT_ENABLED"]:
+        app.before_request(_check_rate_limit)
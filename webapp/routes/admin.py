@@ -1,8 +1,13 @@
 """Admin routes: advance rounds, view stats."""
 
-import json
-from flask import Blueprint, render_template, redirect, url_for, current_app, request
-from webapp.services import tournament
+import time
+from flask import (
+    Blueprint, Response, render_template, redirect, url_for, current_app, request, flash,
+)
+from webapp import metrics
+from webapp.services import tournament, live, export
+from webapp.services.state import get_state, bump_version
+from webapp.services.tallies import attach_tallies, reconcile_tallies
 from webapp.database import get_db
 
 admin_bp = Blueprint("admin", __name__)
@@ -25,21 +30,12 @@ def dashboard(secret):
 
     db = get_db()
     # Vote stats for active matches
-    for m in active:
-        mid = m["match_id"]
-        votes_a = db.execute(
-            "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-            (mid, m["year_a"])
-        ).fetchone()["c"]
-        votes_b = db.execute(
-            "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-            (mid, m["year_b"])
-        ).fetchone()["c"]
-        m["votes_a"] = votes_a
-        m["votes_b"] = votes_b
-        m["total_votes"] = votes_a + votes_b
-
-    total_votes = db.execute("SELECT COUNT(*) as c FROM votes").fetchone()["c"]
+    for m in attach_tallies(active):
+        m["total_votes"] = m["votes_a"] + m["votes_b"]
+
+    total_votes = db.execute(
+        "SELECT COALESCE(SUM(count), 0) as c FROM vote_tallies"
+    ).fetchone()["c"]
     unique_voters = db.execute(
         "SELECT COUNT(DISTINCT voter_id) as c FROM votes"
     ).fetchone()["c"]
@@ -49,13 +45,7 @@ def dashboard(secret):
                   db.execute("SELECT year, seed FROM years ORDER BY seed").fetchall()}
 
     # Revealed rounds
-    row = db.execute(
-        "SELECT value FROM tournament_state WHERE key = 'results_revealed'"
-    ).fetchone()
-    try:
-        revealed_rounds = json.loads(row["value"]) if row else []
-    except Exception:
-        revealed_rounds = []
+    revealed_rounds = sorted(get_state().results_revealed)
 
     # Group completed matches by round for the reveal UI
     completed_by_round = {}
@@ -90,12 +80,30 @@ def dashboard(secret):
     )
 
 
+@admin_bp.route("/admin/<secret>/metrics")
+def metrics_endpoint(secret):
+    if not check_secret(secret):
+        return "Unauthorized", 403
+
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@admin_bp.route("/admin/<secret>/stream")
+def stream(secret):
+    if not check_secret(secret):
+        return "Unauthorized", 403
+
+    return live.stream_response()
+
+
 @admin_bp.route("/admin/<secret>/advance", methods=["POST"])
 def advance(secret):
     if not check_secret(secret):
         return "Unauthorized", 403
 
+    start = time.perf_counter()
     tournament.advance_round()
+    metrics.advance_duration.observe(time.perf_counter() - start)
     return redirect(url_for("admin.dashboard", secret=secret))
 
 
@@ -134,6 +142,37 @@ def reset_round(secret):
     return redirect(url_for("admin.dashboard", secret=secret))
 
 
+@admin_bp.route("/admin/<secret>/reconcile_tallies", methods=["POST"])
+def reconcile(secret):
+    if not check_secret(secret):
+        return "Unauthorized", 403
+
+    drift = reconcile_tallies()
+    if not drift:
+        flash("Tallies reconciled: no drift found.")
+    else:
+        details = "; ".join(
+            f"match {d['match_id']} / {d['year']}: stored {d['stored']}, actual {d['actual']}"
+            for d in drift
+        )
+        flash(f"Tallies reconciled: fixed {len(drift)} drifted row(s) — {details}")
+    return redirect(url_for("admin.dashboard", secret=secret))
+
+
+@admin_bp.route("/admin/<secret>/export/votes.<fmt>")
+def export_votes(secret, fmt):
+    if not check_secret(secret):
+        return "Unauthorized", 403
+    if fmt not in export.FORMATS:
+        return "Not found", 404
+
+    try:
+        filters = export.parse_filters(request.args)
+    except ValueError as e:
+        return str(e), 400
+    return export.stream_export(fmt, filters, gzipped=request.args.get("gzip") == "1")
+
+
 @admin_bp.route("/admin/<secret>/reset", methods=["POST"])
 def reset_tournament(secret):
     if not check_secret(secret):
@@ -142,14 +181,13 @@ def reset_tournament(secret):
     db = get_db()
     db.execute("DELETE FROM voter_finalizations")
     db.execute("DELETE FROM votes")
+    db.execute("DELETE FROM vote_tallies")
     db.execute("UPDATE matches SET winner = NULL, is_active = 0")
     db.execute("UPDATE matches SET year_a = NULL, year_b = NULL WHERE round > 1")
-    db.execute(
-        "UPDATE matches SET is_active = 1 WHERE round = 1 AND match_id IN "
-        "(SELECT match_id FROM matches WHERE round = 1 ORDER BY position LIMIT 4)"
-    )
+    tournament.open_next_wave(1)
     db.execute("UPDATE tournament_state SET value = '1' WHERE key = 'current_round'")
     db.execute("DELETE FROM tournament_state WHERE key = 'results_revealed'")
+    bump_version()
     # Round 1 year_a/year_b stay in the DB — only rounds 2+ are cleared above
     db.commit()
     return redirect(url_for("admin.dashboard", secret=secret))
@@ -1,13 +1,18 @@
 """Bracket display routes."""
 
-from flask import Blueprint, render_template, jsonify, make_response
-from webapp.services import tournament, voting
+from flask import Blueprint, jsonify
+from webapp.page_cache import cached_response, render_page
+from webapp.services import tournament
 
 bracket_bp = Blueprint("bracket", __name__)
 
 
 @bracket_bp.route("/bracket")
 def bracket_page():
+    return cached_response("bracket", _render_bracket)
+
+
+def _render_bracket():
     matches = tournament.get_all_matches()
     current_round = tournament.get_current_round()
     winner = tournament.get_tournament_winner()
@@ -45,29 +50,23 @@ def bracket_page():
     # next match, so showing year_a on top preserves correct bracket progression.
     flip_map = {m["match_id"]: (m["round"] == 1 and m["match_id"] % 2 != 0) for m in matches}
 
-    # Look up this user's picks for all matches
-    voter_id = voting.get_or_create_voter_id()
-    user_votes = {}
-    for m in matches:
-        pick = voting.has_voted(m["match_id"], voter_id)
-        if pick:
-            user_votes[m["match_id"]] = pick
-
-    resp = make_response(render_template(
+    # This user's picks are marked client-side from /me (see bracket.js)
+    return render_page(
         "bracket.html",
         matches=matches,
         current_round=current_round,
         winner=winner,
         section_map=section_map,
         flip_map=flip_map,
-        user_votes=user_votes,
-    ))
-    resp.set_cookie("voter_id", voter_id, max_age=365 * 24 * 3600, samesite="Lax", secure=True)
-    return resp
+    )
 
 
 @bracket_bp.route("/bracket/data")
 def bracket_data():
+    return cached_response("bracket_data", _bracket_data)
+
+
+def _bracket_data():
     matches = tournament.get_all_matches()
     years = tournament.get_all_years()
     current_round = tournament.get_current_round()
@@ -1,45 +1,38 @@
 """Voting routes: landing page, matchup detail, vote submission."""
 
-from flask import Blueprint, render_template, request, jsonify, make_response
-from webapp.services import tournament, voting
+from flask import Blueprint, current_app, render_template, request, jsonify
+from webapp import metrics
+from webapp.page_cache import cached_response, render_page
+from webapp.services import games, tournament, voting, live
+from webapp.services.state import get_state
 
 vote_bp = Blueprint("vote", __name__)
 
 
 @vote_bp.route("/")
 def index():
+    return cached_response("index", _render_index)
+
+
+def _render_index():
     current_round = tournament.get_current_round()
     round_name = tournament.get_round_name(current_round)
     matchups = tournament.get_active_matchups()
     winner = tournament.get_tournament_winner()
-    revealed = tournament.is_results_revealed(current_round)
     deadline = tournament.get_voting_deadline()
-
-    voter_id = voting.get_or_create_voter_id()
-    voter_finalized = voting.is_voter_finalized(voter_id)
     wave_info = tournament.get_wave_info()
 
-    all_voted = bool(matchups)
-    for m in matchups:
-        m["user_voted"] = voting.has_voted(m["match_id"], voter_id)
-        if not m["user_voted"]:
-            all_voted = False
-        if m["user_voted"] and revealed:
-            m["results"] = voting.get_match_results(m["match_id"])
-
-    resp = make_response(render_template(
+    # The voter's picks, lock-in state and revealed results are filled in
+    # client-side from /me, so this page is the same for everyone.
+    return render_template(
         "index.html",
         matchups=matchups,
         current_round=current_round,
         round_name=round_name,
         winner=winner,
         voting_deadline=deadline,
-        voter_finalized=voter_finalized,
-        all_voted=all_voted,
         wave_info=wave_info,
-    ))
-    resp.set_cookie("voter_id", voter_id, max_age=365 * 24 * 3600, samesite="Lax", secure=True)
-    return resp
+    )
 
 
 @vote_bp.route("/matchup/<int:match_id>")
@@ -48,14 +41,20 @@ def matchup(match_id):
     if not match:
         return "Match not found", 404
 
-    games_a = tournament.get_games_for_year(match["year_a"]) if match["year_a"] else []
-    games_b = tournament.get_games_for_year(match["year_b"]) if match["year_b"] else []
+    return cached_response("matchup", lambda: _render_matchup(match), parts=(match_id,))
+
+
+def _render_matchup(match):
+    # Only the first page of each year's games; games.js fetches the rest on scroll
+    games_a = games.games_page(match["year_a"], 1) if match["year_a"] else games.EMPTY_PAGE
+    games_b = games.games_page(match["year_b"], 1) if match["year_b"] else games.EMPTY_PAGE
+    stats_a = games.get_year_stats(match["year_a"]) if match["year_a"] else games.EMPTY_STATS
+    stats_b = games.get_year_stats(match["year_b"]) if match["year_b"] else games.EMPTY_STATS
 
-    voter_id = voting.get_or_create_voter_id()
-    user_voted = voting.has_voted(match_id, voter_id)
-    voter_finalized = voting.is_voter_finalized(voter_id)
     revealed = tournament.is_results_revealed(match["round"])
-    results = voting.get_match_results(match_id) if revealed and (user_voted or match["winner"]) else None
+    # Results of decided matches are public once revealed; results of a match
+    # still being voted on are only shown to its voters, via /me.
+    results = voting.get_match_results(match["match_id"]) if revealed and match["winner"] else None
 
     round_name = tournament.get_round_name(match["round"])
     # Flip only Round 1 (same rule as bracket): odd match_ids show year_b on left.
@@ -63,20 +62,56 @@ def matchup(match_id):
     flip = match["round"] == 1 and match["match_id"] % 2 != 0
     deadline = tournament.get_voting_deadline()
 
-    resp = make_response(render_template(
+    return render_template(
         "matchup.html",
         match=match,
         games_a=games_a,
         games_b=games_b,
-        user_voted=user_voted,
-        voter_finalized=voter_finalized,
+        stats_a=stats_a,
+        stats_b=stats_b,
         results=results,
         revealed=revealed,
         round_name=round_name,
         flip=flip,
         voting_deadline=deadline,
-    ))
-    resp.set_cookie("voter_id", voter_id, max_age=365 * 24 * 3600, samesite="Lax", secure=True)
+    )
+
+
+@vote_bp.route("/year/<int:year>/games")
+def year_games(year):
+    """One page of a year's game tiles, as an HTML fragment inside JSON."""
+    page = request.args.get("page", 1, type=int)
+    if page < 1:
+        return jsonify({"error": "Bad page"}), 400
+    if not games.page_exists(year, page):
+        return jsonify({"error": "No such page"}), 404
+    return cached_response("year_games", lambda: _year_games(year, page), parts=(year, page))
+
+
+def _year_games(year, page):
+    result = games.games_page(year, page)
+    return jsonify({
+        "html": str(result["html"]),
+        "next_page": result["next_page"],
+        "remaining": result["remaining"],
+    })
+
+
+@vote_bp.route("/me")
+def me():
+    """This voter's picks, lock-in state and any revealed results they may see."""
+    voter = voting.get_voter_context()
+    results = {}
+    if voter.picks and get_state().results_revealed:
+        results = _visible_results(voter, voting.get_results_for_matches(voter.picks))
+
+    resp = jsonify({
+        "picks": voter.picks,
+        "finalized": voter.finalized,
+        "results": results,
+    })
+    resp.headers["Cache-Control"] = "private, no-store"
+    resp.set_cookie("voter_id", voter.voter_id, max_age=365 * 24 * 3600, samesite="Lax", secure=True)
     return resp
 
 
@@ -88,14 +123,61 @@ def submit_vote(match_id):
 
     voter_id = voting.get_or_create_voter_id()
     result = voting.cast_vote(match_id, int(data["year"]), voter_id)
+    metrics.votes_cast.inc(result="accepted" if result["success"] else "rejected")
 
     resp = jsonify(result)
     resp.set_cookie("voter_id", voter_id, max_age=365 * 24 * 3600, samesite="Lax", secure=True)
     return resp
 
 
+@vote_bp.route("/votes/batch", methods=["POST"])
+def submit_votes():
+    """Several picks in one request: {"picks": [{"match_id": 1, "year": 1995}, ...]}."""
+    data = request.get_json(silent=True)
+    picks = data.get("picks") if isinstance(data, dict) else None
+    if not isinstance(picks, list) or not picks:
+        return jsonify({"success": False, "error": "Missing picks"}), 400
+    if len(picks) > current_app.config["VOTE_BATCH_MAX_PICKS"]:
+        return jsonify({"success": False, "error": "Too many picks"}), 400
+    try:
+        picks = [(int(p["match_id"]), int(p["year"])) for p in picks]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"success": False, "error": "Each pick needs a match_id and a year"}), 400
+
+    voter_id = voting.get_or_create_voter_id()
+    results = voting.cast_votes(picks, voter_id)
+    for r in results:
+        metrics.votes_cast.inc(result="accepted" if r["success"] else "rejected")
+
+    resp = jsonify({"success": all(r["success"] for r in results), "results": results})
+    resp.set_cookie("voter_id", voter_id, max_age=365 * 24 * 3600, samesite="Lax", secure=True)
+    return resp
+
+
+@vote_bp.route("/live/results")
+def live_results():
+    """Current counts for the active matches this voter voted in, once revealed."""
+    voter = voting.get_voter_context()
+    results = {}
+    if voter.picks and get_state().results_revealed:
+        results = _visible_results(voter, live.active_results())
+    resp = jsonify({"results": results})
+    resp.headers["Cache-Control"] = "private, no-store"
+    return resp
+
+
+def _visible_results(voter, results):
+    """The entries of `results` this voter may see: their own picks, in revealed rounds."""
+    revealed = get_state().results_revealed
+    return {mid: r for mid, r in results.items() if mid in voter.picks and r["round"] in revealed}
+
+
 @vote_bp.route("/results")
 def results():
+    return cached_response("results", _render_results)
+
+
+def _render_results():
     current_round = tournament.get_current_round()
     completed = tournament.get_completed_matches()
 
@@ -109,4 +191,4 @@ def results():
             rounds[r] = {"name": tournament.get_round_name(r), "matches": []}
         rounds[r]["matches"].append(m)
 
-    return render_template("results.html", rounds=rounds, current_round=current_round)
+    return render_page("results.html", rounds=rounds, current_round=current_round)
@@ -0,0 +1,189 @@
+"""Year scoring over a whole BGG ranking, vectorized with NumPy.
+
+Usage:
+  python -m webapp.scoring [--db PATH] [--ranking EXPORT] [--formula NAME ...]
+                           [--top 10] [--write NAME]
+
+Loads (year, rank) pairs into column arrays, either from the games table or
+streamed from a ranking export (see importer.py), and scores every year
+under each formula at once. Formulas are plain functions of a Ranking that
+return one score per year; add one with the @formula decorator.
+
+--write reseeds the bracket's years by one formula's scores and lays the
+bracket out again, in one transaction. Like a fresh import, it refuses a
+tournament that already has votes. It needs --ranking: the games table
+only holds games within the import's --max-rank, so scores and totals
+computed from it would undercount every year.
+"""
+
+import argparse
+import sqlite3
+from functools import cached_property
+from itertools import chain
+
+import numpy as np
+
+from webapp.config import Config
+from webapp.database import migrate
+from webapp.importer import RANK_POINTS, ranking_entries, read_rows, restart_tournament
+
+FORMULAS = {}
+
+# top_n_decay: how many of a year's best games count, and the falloff per place
+TOP_N = 25
+DECAY = 0.9
+
+
+def formula(name):
+    """Register a scoring function `f(ranking) -> scores per ranking.years`."""
+    def register(func):
+        FORMULAS[name] = func
+        return func
+    return register
+
+
+class Ranking:
+    """Ranked games as columns, grouped by year (years ascending)."""
+
+    def __init__(self, year, rank):
+        self.rank = np.asarray(rank, dtype=np.int64)
+        self.years, self.year_index, self.counts = np.unique(
+            np.asarray(year, dtype=np.int64), return_inverse=True, return_counts=True
+        )
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build from an iterable of (year, rank) without materialising it as a list."""
+        flat = np.fromiter(chain.from_iterable(pairs), dtype=np.int64)
+        columns = flat.reshape(-1, 2)
+        return cls(columns[:, 0], columns[:, 1])
+
+    @classmethod
+    def from_db(cls, db):
+        return cls.from_pairs(db.execute("SELECT year_published, rank FROM games"))
+
+    @classmethod
+    def from_export(cls, path):
+        return cls.from_pairs((g[2], g[3]) for g in ranking_entries(read_rows(path)))
+
+    def per_year(self, weights):
+        """Sum per-game `weights` by year."""
+        return np.bincount(self.year_index, weights=weights, minlength=len(self.years))
+
+    @cached_property
+    def points(self):
+        """Rank-tier points per game, as the importer scores them."""
+        limits = np.array([limit for limit, _ in RANK_POINTS])
+        points = np.array([p for _, p in RANK_POINTS] + [1], dtype=np.float64)
+        return points[np.searchsorted(limits, self.rank)]
+
+    @cached_property
+    def place(self):
+        """Each game's place within its year, 0 for the year's best-ranked game."""
+        order = np.lexsort((self.rank, self.year_index))
+        starts = np.cumsum(self.counts) - self.counts
+        place = np.empty_like(order)
+        place[order] = np.arange(len(order)) - np.repeat(starts, self.counts)
+        return place
+
+
+@formula("tiers")
+def tiers(r):
+    """Rank-tier points summed over all of a year's games (the importer's score)."""
+    return r.per_year(r.points)
+
+
+@formula("rank_weighted")
+def rank_weighted(r):
+    """Every game counts, linearly more the better it ranks (1.0 for #1)."""
+    worst = r.rank.max()
+    return r.per_year((worst + 1 - r.rank) / worst)
+
+
+@formula("top_n_decay")
+def top_n_decay(r):
+    """Tier points of a year's TOP_N best games, each place worth DECAY times the last."""
+    weights = np.where(r.place < TOP_N, DECAY ** r.place, 0.0)
+    return r.per_year(r.points * weights)
+
+
+@formula("per_game")
+def per_game(r):
+    """Average tier points per game: depth of quality rather than volume."""
+    return r.per_year(r.points) / r.counts
+
+
+def score_years(ranking, names=None):
+    """{formula name: scores aligned with ranking.years} for each formula in `names`."""
+    return {name: FORMULAS[name](ranking) for name in (names or FORMULAS)}
+
+
+def write_seeds(db, ranking, scores, wave_size=None):
+    """Rescore and reseed the bracket's years from `scores`, then lay the bracket out again.
+
+    Only years already in the tournament are touched; their totals are
+    refreshed from `ranking` too. Runs in one transaction and raises
+    ValueError if any votes have been cast.
+    """
+    by_year = dict(zip(ranking.years.tolist(), scores.tolist()))
+    totals = dict(zip(ranking.years.tolist(), ranking.counts.tolist()))
+    top500 = dict(zip(ranking.years.tolist(), ranking.per_year(ranking.rank <= 500).tolist()))
+
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        if db.execute("SELECT 1 FROM votes LIMIT 1").fetchone():
+            raise ValueError("Votes have been cast; reseeding would change a running tournament")
+        years = [y for (y,) in db.execute("SELECT year FROM years")]
+        ordered = sorted(years, key=lambda y: (-by_year.get(y, 0.0), y))
+        # seed is UNIQUE: move the old seeds out of the way first
+        db.execute("UPDATE years SET seed = -seed")
+        db.executemany(
+            "UPDATE years SET score = ?, seed = ?, total_games = ?, top500_games = ? WHERE year = ?",
+            ((by_year.get(y, 0.0), seed, totals.get(y, 0), int(top500.get(y, 0)), y)
+             for seed, y in enumerate(ordered, start=1)),
+        )
+        restart_tournament(db, ordered, wave_size)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=Config.DATABASE)
+    parser.add_argument("--ranking", help="score a ranking export instead of the games table")
+    parser.add_argument("--formula", action="append", choices=sorted(FORMULAS),
+                        help="formula to show (repeatable; default all)")
+    parser.add_argument("--top", type=int, default=10, help="years to list per formula")
+    parser.add_argument("--write", choices=sorted(FORMULAS),
+                        help="reseed the tournament by this formula (needs --ranking)")
+    args = parser.parse_args()
+    if args.write and not args.ranking:
+        parser.error("--write needs --ranking: the games table holds only the games "
+                     "stored for the matchup pages, not the full ranking")
+
+    db = sqlite3.connect(args.db)
+    try:
+        migrate(db)
+        ranking = Ranking.from_export(args.ranking) if args.ranking else Ranking.from_db(db)
+        results = score_years(ranking, args.formula)
+        print(f"{len(ranking.rank)} ranked games across {len(ranking.years)} years\n")
+        for name, scores in results.items():
+            best = np.argsort(-scores, kind="stable")[:args.top]
+            print(f"{name}: " + ", ".join(
+                f"{ranking.years[i]} ({scores[i]:.1f})" for i in best
+            ))
+        if args.write:
+            seeded = write_seeds(db, ranking, score_years(ranking, [args.write])[args.write])
+            print(f"\nReseeded {len(seeded)} years by {args.write}; top seeds: "
+                  + ", ".join(map(str, seeded[:4])))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Streaming export of votes joined with their matches, as CSV or NDJSON.
+
+Rows are read on a dedicated read-only connection, EXPORT_FETCH_ROWS at a
+time, and written out as they arrive, so memory stays flat however many
+votes there are. In WAL mode (the default) one cursor streams the whole
+export from a single snapshot: readers never block writers, so voting
+carries on while it runs. Under any other journal mode a long read would
+hold a SHARED lock that stalls every commit, so the rows are fetched in
+short keyset pages by vote_id instead.
+"""
+
+import csv
+import io
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from flask import current_app
+from webapp.compress import compress_stream
+
+COLUMNS = ("vote_id", "match_id", "round", "position", "year_a", "year_b",
+           "voted_for", "winner", "voter_id", "voted_at", "ip_address")
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+_SELECT = (
+    "SELECT votes.vote_id, votes.match_id, matches.round, matches.position, "
+    "matches.year_a, matches.year_b, votes.voted_for, matches.winner, votes.voter_id, "
+    "votes.voted_at, votes.ip_address "
+    "FROM votes JOIN matches ON matches.match_id = votes.match_id "
+)
+
+
+def _timestamp(value):
+    # voted_at is stored as SQLite's CURRENT_TIMESTAMP: UTC, "YYYY-MM-DD HH:MM:SS".
+    # Times without an offset are taken as UTC; others are converted to it.
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_filters(args):
+    """{round, match, since, until} from request args; raises ValueError on bad values."""
+    filters = {}
+    for name, parse in (("round", int), ("match", int), ("since", _timestamp), ("until", _timestamp)):
+        value = (args.get(name) or "").strip()
+        if value:
+            try:
+                filters[name] = parse(value)
+            except ValueError:
+                raise ValueError(f"Bad value for {name}: {value!r}")
+    return filters
+
+
+def build_query(filters, paged=False):
+    """(sql, params) selecting the filtered votes; `paged` adds vote_id > ? LIMIT ?."""
+    clauses, params = ["votes.vote_id > ?"] if paged else [], []
+    for name, sql in (("round", "matches.round = ?"), ("match", "votes.match_id = ?"),
+                      ("since", "votes.voted_at >= ?"), ("until", "votes.voted_at < ?")):
+        if name in filters:
+            clauses.append(sql)
+            params.append(filters[name])
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    return f"{_SELECT}{where}ORDER BY votes.vote_id" + (" LIMIT ?" if paged else ""), params
+
+
+def _connect(path):
+    conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True,
+                           check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {int(current_app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def iter_rows(conn, filters, fetch_rows):
+    """Yield lists of up to `fetch_rows` vote rows (tuples in COLUMNS order)."""
+    if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+        sql, params = build_query(filters)
+        cursor = conn.execute(sql, params)
+        while rows := cursor.fetchmany(fetch_rows):
+            yield rows
+        return
+    sql, params = build_query(filters, paged=True)
+    last_id = 0
+    while rows := conn.execute(sql, (last_id, *params, fetch_rows)).fetchall():
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows)
+
+
+def stream_export(fmt, filters, gzipped=False):
+    """A streamed download of the matching votes, oldest first."""
+    config = current_app.config
+    conn = _connect(config["DATABASE"])
+
+    def generate():
+        try:
+            batches = iter_rows(conn, filters, config["EXPORT_FETCH_ROWS"])
+            chunks = _csv_chunks(batches) if fmt == "csv" else _ndjson_chunks(batches)
+            if gzipped:
+                chunks = compress_stream(chunks, "gzip", config["COMPRESS_LEVEL"], None)
+            yield from chunks
+        finally:
+            conn.close()
+
+    filename = f"votes-{time.strftime('%Y%m%d-%H%M%S')}.{fmt}" + (".gz" if gzipped else "")
+    resp = current_app.response_class(
+        generate(), mimetype="application/gzip" if gzipped else FORMATS[fmt]
+    )
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp.headers["Cache-Control"] = "private, no-store"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
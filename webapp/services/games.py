@@ -0,0 +1,105 @@
+"""Each year's ranked games and their statistics, cached in-process.
+
+Games only change when a ranking is imported, and the importer bumps
+games_version in tournament_state when it does. Entries are keyed on that
+version, so after the first request for a year its matchup pages need no
+games or year_stats queries at all, in every worker, until the next import.
+"""
+
+from flask import current_app, render_template
+from markupsafe import Markup
+from webapp.database import get_db
+from webapp.page_cache import LRUCache
+from webapp.services.state import get_state
+
+EMPTY_STATS = {
+    "game_count": 0, "top_25": 0, "top_100": 0, "top_200": 0, "top_500": 0,
+    "best_rank": None, "median_rank": None,
+}
+
+
+def _with_thumb(game):
+    # The local copy from thumbnails.py when there is one, else BGG's own
+    path = game.pop("thumb_path")
+    game["thumb"] = f"{current_app.static_url_path}/{path}" if path else game["thumbnail_url"]
+    return game
+
+
+def _load_year(year):
+    cache = current_app.extensions["games_cache"]
+    key = (get_state().games_version, year)
+    entry = cache.get(key)
+    if entry is None:
+        db = get_db()
+        games = tuple(_with_thumb(dict(g)) for g in db.execute(
+            "SELECT g.*, t.path AS thumb_path FROM games g"
+            " LEFT JOIN thumbnails t ON t.source_url = g.thumbnail_url"
+            " WHERE g.year_published = ? ORDER BY g.rank", (year,)
+        ).fetchall())
+        row = db.execute("SELECT * FROM year_stats WHERE year = ?", (year,)).fetchone()
+        entry = (games, dict(row) if row else dict(EMPTY_STATS, year=year))
+        cache.put(key, entry)
+    return entry
+
+
+def get_games_for_year(year):
+    """The year's games, best rank first. Shared between requests: don't modify."""
+    return _load_year(year)[0]
+
+
+def get_year_stats(year):
+    """{game_count, top_25, top_100, top_200, top_500, best_rank, median_rank} for a year."""
+    return _load_year(year)[1]
+
+
+def _tournament_years():
+    cache = current_app.extensions["games_cache"]
+    key = (get_state().games_version, "years")
+    years = cache.get(key)
+    if years is None:
+        years = frozenset(r["year"] for r in get_db().execute("SELECT year FROM years"))
+        cache.put(key, years)
+    return years
+
+
+def page_exists(year, page):
+    """True if `year` is in the tournament and has a page `page` (page 1 always exists).
+
+    Checked before anything is cached, so made-up years and pages can't
+    push real entries out of the caches.
+    """
+    if year not in _tournament_years():
+        return False
+    size = current_app.config["GAMES_PAGE_SIZE"]
+    return page == 1 or (page > 1 and (page - 1) * size < len(get_games_for_year(year)))
+
+
+EMPTY_PAGE = {"html": Markup(""), "next_page": None, "remaining": 0}
+
+
+def games_page(year, page):
+    """Page `page` (from 1) of a year's game tiles: {html, next_page, remaining}.
+
+    The rendered fragment is cached (in its own LRU of GAMES_CACHE_PAGES
+    entries), so a page costs the same to serve however many games the
+    year has. Check page_exists first for pages asked for by URL.
+    """
+    cache = current_app.extensions["games_page_cache"]
+    key = (get_state().games_version, year, page)
+    entry = cache.get(key)
+    if entry is None:
+        size = current_app.config["GAMES_PAGE_SIZE"]
+        year_games = get_games_for_year(year)
+        shown = page * size
+        entry = {
+            "html": Markup(render_template("_game_tiles.html", games=year_games[shown - size:shown])),
+            "next_page": page + 1 if shown < len(year_games) else None,
+            "remaining": max(len(year_games) - shown, 0),
+        }
+        cache.put(key, entry)
+    return entry
+
+
+def init_app(app):
+    app.extensions["games_cache"] = LRUCache(app.config["GAMES_CACHE_YEARS"])
+    app.extensions["games_page_cache"] = LRUCache(app.config["GAMES_CACHE_PAGES"])
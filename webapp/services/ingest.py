@@ -0,0 +1,149 @@
+"""Group-commit vote ingestion.
+
+When VOTE_GROUP_COMMIT is on, cast_vote (and cast_votes, for a batch of
+picks) validates votes in the request and hands the writes to a
+VoteIngestor. A single writer thread per process drains the bounded queue,
+writes up to VOTE_BATCH_MAX_VOTES votes (or whatever arrived within
+VOTE_BATCH_MAX_WAIT_MS) in one transaction, and only then releases the
+waiting requests — so each vote is durable before its caller gets a
+response, but a burst of votes shares one commit.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from webapp.database import get_db
+from webapp.services import voting
+
+# Upper bound on how long a request waits for its batch to commit
+RESULT_TIMEOUT_S = 30
+
+_STILL_OPEN = """
+    SELECT EXISTS (SELECT 1 FROM matches WHERE match_id = ? AND is_active = 1 AND winner IS NULL),
+           EXISTS (SELECT 1 FROM voter_finalizations WHERE voter_id = ?)
+"""
+
+
+class VoteIngestor:
+    def __init__(self, app):
+        self.app = app
+        self.max_votes = app.config["VOTE_BATCH_MAX_VOTES"]
+        self.max_wait = app.config["VOTE_BATCH_MAX_WAIT_MS"] / 1000
+        self.queue_size = app.config["VOTE_QUEUE_SIZE"]
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def _ensure_writer(self):
+        # Started lazily, and restarted after fork: threads do not survive
+        # into the children of a pre-forking WSGI server.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            threading.Thread(
+                target=self._run, args=(self._queue,), name="vote-writer", daemon=True
+            ).start()
+            self._pid = os.getpid()
+
+    def submit(self, match_id, voted_for, voter_id, ip_address):
+        """Queue a validated vote and block until its batch commits.
+
+        Returns None on success, or an error message.
+        """
+        return self.submit_many([(match_id, voted_for, voter_id, ip_address)])[0]
+
+    def submit_many(self, votes):
+        """Queue validated (match_id, voted_for, voter_id, ip_address) votes and
+        block until they commit. Returns None or an error message per vote.
+
+        The votes may be split across the writer's batches.
+        """
+        self._ensure_writer()
+        futures = []
+        for vote in votes:
+            future = Future()
+            try:
+                self._queue.put_nowait((*vote, future))
+            except queue.Full:
+                future.set_result("Too many votes right now, please try again")
+            futures.append(future)
+        deadline = time.monotonic() + RESULT_TIMEOUT_S
+        return [self._result(f, deadline) for f in futures]
+
+    @staticmethod
+    def _result(future, deadline):
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            return "Vote could not be saved in time, please try again"
+        except sqlite3.Error:
+            return "Vote could not be saved, please try again"
+
+    def _run(self, q):
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_votes:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # Keep the writer alive; fail only this batch's callers
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _flush(self, batch):
+        with self.app.app_context():
+            db = get_db()
+            errors = []
+            try:
+                db.execute("BEGIN IMMEDIATE")
+                for match_id, voted_for, voter_id, ip_address, _ in batch:
+                    # Checked again under the write lock: the match may have
+                    # closed, or the voter finalised, since the request checked
+                    still_open, finalized = db.execute(_STILL_OPEN, (match_id, voter_id)).fetchone()
+                    if not still_open:
+                        errors.append("Match is not active")
+                        continue
+                    if finalized:
+                        errors.append("Your votes are finalised")
+                        continue
+                    # A savepoint per vote so one bad row doesn't sink the batch
+                    db.execute("SAVEPOINT vote")
+                    try:
+                        voting.write_vote(match_id, voted_for, voter_id, ip_address)
+                    except sqlite3.IntegrityError:
+                        db.execute("ROLLBACK TO vote")
+                        errors.append("Invalid vote")
+                    else:
+                        errors.append(None)
+                    db.execute("RELEASE vote")
+                db.commit()
+            except sqlite3.Error as e:
+                if db.in_transaction:
+                    db.rollback()
+                for *_, future in batch:
+                    future.set_exception(e)
+                return
+
+        for (*_, future), error in zip(batch, errors):
+            future.set_result(error)
+
+
+def init_app(app):
+    if app.config["VOTE_GROUP_COMMIT"]:
+        app.extensions["vote_ingestor"] = VoteIngestor(app)
@@ -0,0 +1,230 @@
+"""Live tallies: pushed to the admin dashboard, polled by voters.
+
+One TallyBroadcaster per process runs a single poller thread that reads the
+active matches' tallies (plus total votes and unique voters) every
+LIVE_POLL_INTERVAL_S seconds while anyone is listening, and fans each change
+out to every subscriber's queue. Event ids carry a per-process epoch so a
+client reconnecting with Last-Event-ID gets the missed deltas replayed from
+a short backlog, or a fresh snapshot if it was talking to another worker.
+Each stream holds a worker for as long as it is open, so only admins get one.
+
+Voters instead poll /live/results, which filters active_results() down to
+the matches they voted in (see routes/vote.py). Those results are read at
+most once per LIVE_RESULTS_POLL_S per process, however many voters poll.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from flask import current_app, request
+from webapp.database import get_db
+from webapp.services import tournament, voting
+from webapp.services.state import get_state
+from webapp.services.tallies import attach_tallies
+
+# Deltas kept for Last-Event-ID replay
+EVENT_BACKLOG = 200
+# Events a slow subscriber may fall behind by before it is dropped
+SUBSCRIBER_BACKLOG = 50
+# Comment lines sent while idle so dead connections are noticed
+HEARTBEAT_S = 15
+
+
+class TallyBroadcaster:
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config["LIVE_POLL_INTERVAL_S"]
+        self.max_subscribers = app.config["LIVE_MAX_SUBSCRIBERS"]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def _ensure_poller(self):
+        # Started lazily, and restarted after fork like the vote writer
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.epoch = uuid.uuid4().hex[:8]
+            self._seq = 0
+            self._snapshot = {}
+            self._events = deque(maxlen=EVENT_BACKLOG)
+            self._subscribers = set()
+            threading.Thread(target=self._run, name="tally-poller", daemon=True).start()
+            self._pid = os.getpid()
+
+    def event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def subscribe(self, last_event_id=None):
+        """Register a listener. Returns its queue, or None if at capacity.
+
+        The queue yields (event_id, payload) tuples; None means "disconnect".
+        """
+        self._ensure_poller()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            q = queue.Queue(maxsize=SUBSCRIBER_BACKLOG)
+            epoch, _, seq = (last_event_id or "").partition("-")
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            missed = None
+            if epoch == self.epoch and seq.isdigit() and int(seq) >= oldest - 1:
+                missed = [(s, p) for s, p in self._events if s > int(seq)]
+            if missed is not None and len(missed) < SUBSCRIBER_BACKLOG:
+                # Resume: replay only what this client missed
+                for event_seq, payload in missed:
+                    q.put_nowait((self.event_id(event_seq), payload))
+            elif self._snapshot:
+                q.put_nowait((
+                    self.event_id(self._seq),
+                    dict(self._snapshot, removed=[], full=True),
+                ))
+            self._subscribers.add(q)
+        self._wake.set()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._subscribers:
+                continue
+            try:
+                with self.app.app_context():
+                    snapshot = self._poll()
+            except Exception:
+                self.app.logger.exception("Live tally poll failed")
+                continue
+            self._publish(snapshot)
+
+    def _poll(self):
+        db = get_db()
+        matches = {}
+        for m in attach_tallies(tournament.get_active_matchups()):
+            matches[str(m["match_id"])] = {
+                "round": m["round"],
+                "year_a": m["year_a"],
+                "year_b": m["year_b"],
+                "votes_a": m["votes_a"],
+                "votes_b": m["votes_b"],
+            }
+        total_votes = db.execute(
+            "SELECT COALESCE(SUM(count), 0) as c FROM vote_tallies"
+        ).fetchone()["c"]
+        # COUNT(DISTINCT) is the expensive part, and can only move with the total
+        if total_votes != self._snapshot.get("total_votes"):
+            unique_voters = db.execute(
+                "SELECT COUNT(DISTINCT voter_id) as c FROM votes"
+            ).fetchone()["c"]
+        else:
+            unique_voters = self._snapshot["unique_voters"]
+        return {"matches": matches, "total_votes": total_votes, "unique_voters": unique_voters}
+
+    def _publish(self, snapshot):
+        previous = self._snapshot
+        old_matches = previous.get("matches", {})
+        changed = {
+            mid: m for mid, m in snapshot["matches"].items() if old_matches.get(mid) != m
+        }
+        removed = [mid for mid in old_matches if mid not in snapshot["matches"]]
+        if (previous and not changed and not removed
+                and snapshot["total_votes"] == previous["total_votes"]
+                and snapshot["unique_voters"] == previous["unique_voters"]):
+            return
+
+        payload = {
+            "matches": changed,
+            "removed": removed,
+            "total_votes": snapshot["total_votes"],
+            "unique_voters": snapshot["unique_voters"],
+            "full": not previous,
+        }
+        with self._lock:
+            self._seq += 1
+            self._snapshot = snapshot
+            self._events.append((self._seq, payload))
+            event = (self.event_id(self._seq), payload)
+            for q in list(self._subscribers):
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    # Too far behind: drop it; the browser reconnects and resumes
+                    self._subscribers.discard(q)
+                    while not q.empty():
+                        q.get_nowait()
+                    q.put_nowait(None)
+
+
+def stream_response():
+    """An SSE response of tally events for the current request.
+
+    Streams close after LIVE_STREAM_MAX_S so long-lived connections don't
+    pin a worker forever; EventSource reconnects and resumes by id.
+    """
+    broadcaster = current_app.extensions["tally_broadcaster"]
+    q = broadcaster.subscribe(request.headers.get("Last-Event-ID"))
+    if q is None:
+        return "Too many live viewers right now", 503
+    max_age = current_app.config["LIVE_STREAM_MAX_S"]
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            deadline = time.monotonic() + max_age
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    event = q.get(timeout=min(HEARTBEAT_S, remaining))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                event_id, payload = event
+                yield f"id: {event_id}\nevent: tally\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            broadcaster.unsubscribe(q)
+
+    resp = current_app.response_class(generate(), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    # Stop reverse proxies (nginx) from buffering the stream
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
+# {database path: (expires_at, state version, results)}
+_active_results = {}
+_active_results_lock = threading.Lock()
+
+
+def active_results() -> dict:
+    """{match_id: results} for every active match, at most LIVE_RESULTS_POLL_S old.
+
+    Unfiltered: callers must show each voter only their own revealed matches.
+    """
+    path = current_app.config["DATABASE"]
+    version = get_state().version
+    entry = _active_results.get(path)
+    if entry is None or entry[0] <= time.monotonic() or entry[1] != version:
+        with _active_results_lock:
+            entry = _active_results.get(path)
+            if entry is None or entry[0] <= time.monotonic() or entry[1] != version:
+                match_ids = [m["match_id"] for m in tournament.get_active_matchups()]
+                entry = (time.monotonic() + current_app.config["LIVE_RESULTS_POLL_S"],
+                         version, voting.get_results_for_matches(match_ids))
+                _active_results[path] = entry
+    return entry[2]
+
+
+def init_app(app):
+    app.extensions["tally_broadcaster"] = TallyBroadcaster(app)
@@ -0,0 +1,110 @@
+"""Cached tournament_state: loaded once per process, reloaded only on change.
+
+Every writer to tournament-level state calls bump_version() inside its own
+transaction. Readers then need a single primary-key lookup of the version
+row per request to know whether their cached copy is still current, which
+also picks up writes made by other worker processes.
+
+The same lookup reads games_version, which imports and thumbnail builds
+bump (the cached state is reloaded when either version moves), and
+finalizations_version, which finalize_voter bumps instead of state_version
+so voter lock-ins don't invalidate cached pages (see voting.py).
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from flask import g, current_app
+from webapp.database import get_db
+
+
+@dataclass(frozen=True)
+class TournamentState:
+    version: int
+    current_round: int
+    voting_deadline: str | None  # as entered by the admin, for display
+    deadline_at: datetime | None  # parsed once, for comparisons
+    results_revealed: frozenset
+    games_version: int  # bumped only when games or their thumbnails change
+
+    def deadline_passed(self) -> bool:
+        return self.deadline_at is not None and datetime.now() > self.deadline_at
+
+
+# {database path: TournamentState}, shared by all threads of this process
+_cache = {}
+
+
+def get_state() -> TournamentState:
+    """The current tournament state, checked against the version once per request."""
+    if "tournament_state" not in g:
+        version, games_version, g.finalizations_version = get_versions()
+        g.tournament_state = _load(version, games_version)
+    return g.tournament_state
+
+
+def get_finalizations_version() -> int:
+    """finalizations_version as read by this request's state check."""
+    get_state()
+    return g.finalizations_version
+
+
+def get_versions() -> tuple[int, int, int]:
+    """(state_version, games_version, finalizations_version), in one primary-key lookup."""
+    rows = dict(get_db().execute(
+        "SELECT key, value FROM tournament_state "
+        "WHERE key IN ('state_version', 'games_version', 'finalizations_version')"
+    ).fetchall())
+    return tuple(int(rows.get(key, 0))
+                 for key in ("state_version", "games_version", "finalizations_version"))
+
+
+def bump_version():
+    """Mark tournament state as changed. Does not commit."""
+    get_db().execute(
+        "INSERT INTO tournament_state (key, value) VALUES ('state_version', '1') "
+        "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+    g.pop("tournament_state", None)
+
+
+def bump_finalizations_version():
+    """Mark the set of finalized voters as changed. Does not commit."""
+    get_db().execute(
+        "INSERT INTO tournament_state (key, value) VALUES ('finalizations_version', '1') "
+        "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+    g.pop("tournament_state", None)
+
+
+def _load(version, games_version) -> TournamentState:
+    path = current_app.config["DATABASE"]
+    cached = _cache.get(path)
+    if cached is not None and cached.version == version and cached.games_version == games_version:
+        return cached
+
+    rows = {
+        r["key"]: r["value"]
+        for r in get_db().execute("SELECT key, value FROM tournament_state").fetchall()
+    }
+    deadline = (rows.get("voting_deadline") or "").strip() or None
+    try:
+        deadline_at = datetime.fromisoformat(deadline) if deadline else None
+    except ValueError:
+        deadline_at = None
+    try:
+        revealed = frozenset(json.loads(rows.get("results_revealed") or "[]"))
+    except Exception:
+        revealed = frozenset()
+
+    state = TournamentState(
+        version=version,
+        current_round=int(rows.get("current_round", 1)),
+        voting_deadline=deadline,
+        deadline_at=deadline_at,
+        results_revealed=revealed,
+        games_version=games_version,
+    )
+    _cache[path] = state
+    return state
@@ -0,0 +1,111 @@
+"""Vote tallies: per-match vote counts for any set of matches in one query.
+
+Counts are read from the materialized vote_tallies table, which every writer
+to votes keeps in step inside its own transaction. reconcile_tallies()
+rebuilds it from votes if the two ever drift apart.
+"""
+
+import json
+from webapp.database import get_db
+from webapp.services.state import bump_version
+
+
+def get_tallies(match_ids=None) -> dict:
+    """Returns {match_id: {year: count}} using a single query.
+
+    Pass None to tally every match. Matches without votes are absent from the
+    result, so callers should default to 0.
+    """
+    db = get_db()
+    if match_ids is None:
+        rows = db.execute(
+            "SELECT match_id, year, count FROM vote_tallies"
+        ).fetchall()
+    else:
+        match_ids = list(match_ids)
+        if not match_ids:
+            return {}
+        # json_each keeps this a single bound parameter however many ids there are
+        rows = db.execute(
+            "SELECT match_id, year, count FROM vote_tallies "
+            "WHERE match_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(match_ids),)
+        ).fetchall()
+
+    tallies = {}
+    for r in rows:
+        tallies.setdefault(r["match_id"], {})[r["year"]] = r["count"]
+    return tallies
+
+
+def attach_tallies(matches: list) -> list:
+    """Sets votes_a / votes_b on each match dict in place and returns the list."""
+    tallies = get_tallies(m["match_id"] for m in matches)
+    for m in matches:
+        counts = tallies.get(m["match_id"], {})
+        m["votes_a"] = counts.get(m["year_a"], 0)
+        m["votes_b"] = counts.get(m["year_b"], 0)
+    return matches
+
+
+def retract_vote(match_id: int, voter_id: str):
+    """Decrements the tally for this voter's current pick, if they have one.
+
+    Must run before the INSERT OR REPLACE that overwrites the pick. Does not
+    commit — the caller owns the transaction.
+    """
+    get_db().execute(
+        "UPDATE vote_tallies SET count = count - 1 "
+        "WHERE (match_id, year) = "
+        "(SELECT match_id, voted_for FROM votes WHERE match_id = ? AND voter_id = ?)",
+        (match_id, voter_id)
+    )
+
+
+def add_vote(match_id: int, year: int):
+    """Increments the tally for one new vote. Does not commit."""
+    get_db().execute(
+        "INSERT INTO vote_tallies (match_id, year, count) VALUES (?, ?, 1) "
+        "ON CONFLICT (match_id, year) DO UPDATE SET count = count + 1",
+        (match_id, year)
+    )
+
+
+def reconcile_tallies() -> list:
+    """Rebuild vote_tallies from votes. Returns the rows that had drifted.
+
+    Each drift entry is {match_id, year, stored, actual}.
+    """
+    db = get_db()
+    # Take the write lock up front so no vote lands between the diff and the rebuild
+    db.execute("BEGIN IMMEDIATE")
+    actual = {
+        (r["match_id"], r["voted_for"]): r["c"]
+        for r in db.execute(
+            "SELECT match_id, voted_for, COUNT(*) as c FROM votes "
+            "GROUP BY match_id, voted_for"
+        ).fetchall()
+    }
+    stored = {
+        (r["match_id"], r["year"]): r["count"]
+        for r in db.execute(
+            "SELECT match_id, year, count FROM vote_tallies"
+        ).fetchall()
+    }
+
+    drift = []
+    for key in sorted(actual.keys() | stored.keys()):
+        a, s = actual.get(key, 0), stored.get(key, 0)
+        if a != s:
+            drift.append({"match_id": key[0], "year": key[1], "stored": s, "actual": a})
+
+    db.execute("DELETE FROM vote_tallies")
+    db.execute(
+        "INSERT INTO vote_tallies (match_id, year, count) "
+        "SELECT match_id, voted_for, COUNT(*) FROM votes GROUP BY match_id, voted_for"
+    )
+    if drift:
+        # Published tallies may have changed, so cached pages must go
+        bump_version()
+    db.commit()
+    return drift
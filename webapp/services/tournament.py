@@ -1,14 +1,13 @@
 """Tournament logic: bracket queries, round advancement."""
 
+from flask import current_app
 from webapp.database import get_db
+from webapp.services.state import get_state, bump_version
+from webapp.services.tallies import attach_tallies
 
 
 def get_current_round():
-    db = get_db()
-    row = db.execute(
-        "SELECT value FROM tournament_state WHERE key = 'current_round'"
-    ).fetchone()
-    return int(row["value"]) if row else 1
+    return get_state().current_round
 
 
 def get_round_name(round_num):
@@ -51,37 +50,17 @@ def get_match(match_id):
     return dict(match) if match else None
 
 
-def get_games_for_year(year):
-    db = get_db()
-    games = db.execute(
-        "SELECT * FROM games WHERE year_published = ? ORDER BY rank",
-        (year,)
-    ).fetchall()
-    return [dict(g) for g in games]
-
-
 def get_all_matches():
     db = get_db()
     matches = db.execute("""
         SELECT * FROM matches ORDER BY round, position
     """).fetchall()
-    result = []
-    for m in matches:
-        d = dict(m)
-        if m["winner"]:
-            mid = m["match_id"]
-            d["votes_a"] = db.execute(
-                "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-                (mid, m["year_a"])
-            ).fetchone()["c"]
-            d["votes_b"] = db.execute(
-                "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-                (mid, m["year_b"])
-            ).fetchone()["c"]
-        else:
-            d["votes_a"] = 0
-            d["votes_b"] = 0
-        result.append(d)
+    result = [dict(m) for m in matches]
+    # Live tallies stay hidden: only decided matches expose their counts
+    attach_tallies([d for d in result if d["winner"]])
+    for d in result:
+        d.setdefault("votes_a", 0)
+        d.setdefault("votes_b", 0)
     return result
 
 
@@ -91,106 +70,95 @@ def get_all_years():
     return [dict(y) for y in years]
 
 
+# Active, undecided matches of a round with their tallies and the winner each
+# would get: most votes, ties going to the better (lower) seed.
+_WAVE_RESULTS = """
+    SELECT m.match_id, m.year_a, m.year_b,
+           COALESCE(ta.count, 0) AS votes_a, COALESCE(tb.count, 0) AS votes_b,
+           CASE
+               WHEN COALESCE(ta.count, 0) > COALESCE(tb.count, 0) THEN m.year_a
+               WHEN COALESCE(ta.count, 0) < COALESCE(tb.count, 0) THEN m.year_b
+               WHEN ya.seed <= yb.seed THEN m.year_a
+               ELSE m.year_b
+           END AS winner
+    FROM matches m
+    LEFT JOIN vote_tallies ta ON ta.match_id = m.match_id AND ta.year = m.year_a
+    LEFT JOIN vote_tallies tb ON tb.match_id = m.match_id AND tb.year = m.year_b
+    LEFT JOIN years ya ON ya.year = m.year_a
+    LEFT JOIN years yb ON yb.year = m.year_b
+    WHERE m.round = ? AND m.is_active = 1 AND m.winner IS NULL
+"""
+
+
+def get_wave_size(round_num):
+    """Matches open at once in a round, or None to open the whole round."""
+    sizes = current_app.config["ROUND_WAVE_SIZES"]
+    return sizes.get(round_num, current_app.config["WAVE_SIZE"]) or None
+
+
+def open_next_wave(round_num):
+    """Activate the next wave of a round's unplayed matches. Returns how many opened.
+
+    Doesn't commit; callers do, together with their other changes.
+    """
+    return get_db().execute("""
+        UPDATE matches SET is_active = 1 WHERE match_id IN (
+            SELECT match_id FROM matches
+            WHERE round = ? AND is_active = 0 AND winner IS NULL
+            ORDER BY position LIMIT ?
+        )
+    """, (round_num, get_wave_size(round_num) or -1)).rowcount
+
+
 def advance_round():
     """Tally votes for active matches, set winners.
 
-    Wave-aware: if the current round has >4 matches and unactivated ones remain,
-    activates the next batch of 4 instead of jumping to the next round.
+    Wave-aware: if unplayed matches remain in the current round, opens the
+    next wave of it (see get_wave_size) instead of moving on. Runs a fixed
+    number of set-based statements however large the bracket or wave.
     """
     db = get_db()
+    # Hold the write lock so no vote lands between tallying and closing
+    db.execute("BEGIN IMMEDIATE")
     current_round = get_current_round()
 
-    active_matches = db.execute(
-        "SELECT * FROM matches WHERE round = ? AND is_active = 1 AND winner IS NULL",
-        (current_round,)
-    ).fetchall()
-
-    if not active_matches:
+    results = [dict(r) for r in db.execute(
+        _WAVE_RESULTS + " ORDER BY m.position", (current_round,)
+    ).fetchall()]
+    if not results:
+        db.rollback()
         return {"error": "No active matches to advance"}
 
-    results = []
-    for match in active_matches:
-        mid = match["match_id"]
-        votes_a = db.execute(
-            "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-            (mid, match["year_a"])
-        ).fetchone()["c"]
-        votes_b = db.execute(
-            "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-            (mid, match["year_b"])
-        ).fetchone()["c"]
-
-        # Winner is whichever year got more votes; tie goes to year_a (higher seed)
-        winner = match["year_a"] if votes_a >= votes_b else match["year_b"]
-
-        db.execute(
-            "UPDATE matches SET winner = ?, is_active = 0 WHERE match_id = ?",
-            (winner, mid)
+    db.execute(f"""
+        UPDATE matches SET winner = r.winner, is_active = 0
+        FROM ({_WAVE_RESULTS}) AS r
+        WHERE matches.match_id = r.match_id
+    """, (current_round,))
+
+    # Fill next-round slots from their feeders: lower position plays as year_a
+    db.execute("""
+        UPDATE matches SET
+            year_a = (SELECT f.winner FROM matches f WHERE f.next_match_id = matches.match_id
+                      ORDER BY f.position LIMIT 1),
+            year_b = (SELECT f.winner FROM matches f WHERE f.next_match_id = matches.match_id
+                      ORDER BY f.position LIMIT 1 OFFSET 1)
+        WHERE match_id IN (
+            SELECT next_match_id FROM matches WHERE round = ? AND winner IS NOT NULL
         )
+    """, (current_round,))
 
-        # Place winner into next match
-        if match["next_match_id"]:
-            next_match = db.execute(
-                "SELECT * FROM matches WHERE match_id = ?",
-                (match["next_match_id"],)
-            ).fetchone()
-            if next_match["year_a"] is None:
-                db.execute(
-                    "UPDATE matches SET year_a = ? WHERE match_id = ?",
-                    (winner, match["next_match_id"])
-                )
-            else:
-                db.execute(
-                    "UPDATE matches SET year_b = ? WHERE match_id = ?",
-                    (winner, match["next_match_id"])
-                )
-
-        results.append({
-            "match_id": mid,
-            "year_a": match["year_a"],
-            "year_b": match["year_b"],
-            "votes_a": votes_a,
-            "votes_b": votes_b,
-            "winner": winner,
-        })
-
-    # Check for remaining unactivated matches in the current round
-    pending = db.execute(
-        "SELECT match_id FROM matches WHERE round = ? AND is_active = 0 AND winner IS NULL "
-        "ORDER BY position",
-        (current_round,)
-    ).fetchall()
-
-    if pending:
-        # More waves left in this round — activate next batch of up to 4
-        for row in pending[:4]:
-            db.execute(
-                "UPDATE matches SET is_active = 1 WHERE match_id = ?", (row["match_id"],)
-            )
+    if open_next_wave(current_round):
         next_round = current_round
     else:
         # All matches in this round done — advance to next round
         next_round = current_round + 1
-        next_matches = db.execute(
-            "SELECT match_id FROM matches WHERE round = ? ORDER BY position", (next_round,)
-        ).fetchall()
-        if next_matches:
-            if len(next_matches) > 4:
-                # Large round: start with first wave of 4
-                for row in next_matches[:4]:
-                    db.execute(
-                        "UPDATE matches SET is_active = 1 WHERE match_id = ?", (row["match_id"],)
-                    )
-            else:
-                # Small round (QF/SF/Final): activate all at once
-                db.execute(
-                    "UPDATE matches SET is_active = 1 WHERE round = ?", (next_round,)
-                )
+        if open_next_wave(next_round):
             db.execute(
                 "UPDATE tournament_state SET value = ? WHERE key = 'current_round'",
                 (str(next_round),)
             )
 
+    bump_version()
     db.commit()
     return {"advanced": len(results), "results": results, "next_round": next_round}
 
@@ -198,20 +166,21 @@ def advance_round():
 def get_wave_info():
     """Returns (current_wave, total_waves) if the current round uses wave mode, else None.
 
-    Wave mode applies when a round has more than 4 matches.
+    Wave mode applies when a round has more matches than its wave size.
     """
     db = get_db()
     current_round = get_current_round()
+    size = get_wave_size(current_round)
     total = db.execute(
         "SELECT COUNT(*) as c FROM matches WHERE round = ?", (current_round,)
     ).fetchone()["c"]
-    if total <= 4:
+    if size is None or total <= size:
         return None
     completed = db.execute(
         "SELECT COUNT(*) as c FROM matches WHERE round = ? AND winner IS NOT NULL",
         (current_round,)
     ).fetchone()["c"]
-    return ((completed // 4) + 1, total // 4)
+    return ((completed // size) + 1, -(-total // size))
 
 
 def reset_current_wave():
@@ -222,8 +191,13 @@ def reset_current_wave():
         "SELECT match_id FROM matches WHERE round = ? AND is_active = 1 AND winner IS NULL",
         (current_round,)
     ).fetchall()
-    for row in active:
-        db.execute("DELETE FROM votes WHERE match_id = ?", (row["match_id"],))
+    for table in ("votes", "vote_tallies"):
+        db.execute(
+            f"DELETE FROM {table} WHERE match_id IN (SELECT match_id FROM matches "
+            "WHERE round = ? AND is_active = 1 AND winner IS NULL)",
+            (current_round,)
+        )
+    bump_version()
     db.commit()
     return {"cleared_matches": len(active)}
 
@@ -238,10 +212,11 @@ def reset_current_round():
     current_round = get_current_round()
 
     # Clear votes and reset all matches in this round
-    for row in db.execute(
-        "SELECT match_id FROM matches WHERE round = ?", (current_round,)
-    ).fetchall():
-        db.execute("DELETE FROM votes WHERE match_id = ?", (row["match_id"],))
+    for table in ("votes", "vote_tallies"):
+        db.execute(
+            f"DELETE FROM {table} WHERE match_id IN (SELECT match_id FROM matches WHERE round = ?)",
+            (current_round,)
+        )
     db.execute(
         "UPDATE matches SET winner = NULL, is_active = 0 WHERE round = ?",
         (current_round,)
@@ -254,13 +229,9 @@ def reset_current_round():
     )
 
     # Re-activate first wave of this round
-    first_wave = db.execute(
-        "SELECT match_id FROM matches WHERE round = ? ORDER BY position LIMIT 4",
-        (current_round,)
-    ).fetchall()
-    for row in first_wave:
-        db.execute("UPDATE matches SET is_active = 1 WHERE match_id = ?", (row["match_id"],))
+    open_next_wave(current_round)
 
+    bump_version()
     db.commit()
     return {"round_reset": current_round}
 
@@ -277,22 +248,7 @@ def get_completed_matches(round_num=None):
             "SELECT * FROM matches WHERE winner IS NOT NULL ORDER BY round, position"
         ).fetchall()
 
-    result = []
-    for m in matches:
-        mid = m["match_id"]
-        votes_a = db.execute(
-            "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-            (mid, m["year_a"])
-        ).fetchone()["c"]
-        votes_b = db.execute(
-            "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-            (mid, m["year_b"])
-        ).fetchone()["c"]
-        d = dict(m)
-        d["votes_a"] = votes_a
-        d["votes_b"] = votes_b
-        result.append(d)
-    return result
+    return attach_tallies([dict(m) for m in matches])
 
 
 def get_tournament_winner():
@@ -308,44 +264,22 @@ import json as _json
 
 
 def is_results_revealed(round_num: int) -> bool:
-    db = get_db()
-    row = db.execute(
-        "SELECT value FROM tournament_state WHERE key = 'results_revealed'"
-    ).fetchone()
-    if not row:
-        return False
-    try:
-        return round_num in _json.loads(row["value"])
-    except Exception:
-        return False
+    return round_num in get_state().results_revealed
 
 
 def reveal_results_for_round(round_num: int):
     db = get_db()
-    row = db.execute(
-        "SELECT value FROM tournament_state WHERE key = 'results_revealed'"
-    ).fetchone()
-    try:
-        revealed = _json.loads(row["value"]) if row else []
-    except Exception:
-        revealed = []
-    if round_num not in revealed:
-        revealed.append(round_num)
+    revealed = sorted(get_state().results_revealed | {round_num})
     db.execute(
         "INSERT OR REPLACE INTO tournament_state (key, value) VALUES ('results_revealed', ?)",
         (_json.dumps(revealed),)
     )
+    bump_version()
     db.commit()
 
 
 def get_voting_deadline() -> str | None:
-    db = get_db()
-    row = db.execute(
-        "SELECT value FROM tournament_state WHERE key = 'voting_deadline'"
-    ).fetchone()
-    if not row or not row["value"].strip():
-        return None
-    return row["value"].strip()
+    return get_state().voting_deadline
 
 
 def set_voting_deadline(deadline_str: str):
@@ -354,4 +288,5 @@ def set_voting_deadline(deadline_str: str):
         "INSERT OR REPLACE INTO tournament_state (key, value) VALUES ('voting_deadline', ?)",
         (deadline_str,)
     )
+    bump_version()
     db.commit()
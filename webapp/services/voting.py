@@ -1,9 +1,13 @@
 """Voting logic: cast votes, check finalization, get results."""
 
+import json
+import threading
 import uuid
-from datetime import datetime
-from flask import request
-from webapp.database import get_db
+from dataclasses import dataclass, field
+from flask import request, current_app, g
+from webapp.database import get_db, get_pool
+from webapp.services import tallies
+from webapp.services.state import bump_finalizations_version, get_finalizations_version, get_state
 
 
 def get_or_create_voter_id():
@@ -14,34 +18,115 @@ def get_or_create_voter_id():
     return voter_id
 
 
+@dataclass
+class VoterContext:
+    """Everything about one voter a page needs, loaded once per request."""
+    voter_id: str
+    picks: dict = field(default_factory=dict)  # match_id -> year voted for
+    explicitly_finalized: bool = False
+    deadline_passed: bool = False
+
+    @property
+    def finalized(self) -> bool:
+        return self.explicitly_finalized or self.deadline_passed
+
+
+def get_voter_context(voter_id: str | None = None) -> VoterContext:
+    """Load a voter's picks in one query, memoized on flask.g.
+
+    Defaults to the voter identified by the request cookie.
+    """
+    voter_id = voter_id or get_or_create_voter_id()
+    contexts = g.setdefault("voter_contexts", {})
+    if voter_id not in contexts:
+        deadline_passed = get_state().deadline_passed()
+        ctx = VoterContext(
+            voter_id,
+            explicitly_finalized=not deadline_passed and voter_id in _finalized_voters(),
+            deadline_passed=deadline_passed,
+        )
+        rows = get_db().execute(
+            "SELECT match_id, voted_for FROM votes WHERE voter_id = ?", (voter_id,)
+        ).fetchall()
+        for r in rows:
+            ctx.picks[r["match_id"]] = r["voted_for"]
+        contexts[voter_id] = ctx
+    return contexts[voter_id]
+
+
+class _FinalizedVoters:
+    """Finalized voter ids of one database, as of the versions they were read at."""
+
+    def __init__(self, state_version):
+        self.state_version = state_version
+        self.version = None
+        self.last_rowid = 0
+        self.voters = set()
+
+    def catch_up(self, version):
+        """Add rows written since the last read (by any worker) and note `version`."""
+        rows = get_db().execute(
+            "SELECT rowid, voter_id FROM voter_finalizations WHERE rowid > ? ORDER BY rowid",
+            (self.last_rowid,)
+        ).fetchall()
+        self.voters.update(r["voter_id"] for r in rows)
+        if rows:
+            self.last_rowid = rows[-1]["rowid"]
+        self.version = version
+
+
+# {database path: _FinalizedVoters}, shared by all threads of this process
+_finalized = {}
+_finalized_lock = threading.Lock()
+
+
+def _finalized_voters() -> set:
+    """This process's set of finalized voter ids, brought up to date if needed.
+
+    Costs no query while neither version has moved. A new finalization
+    (finalizations_version) is picked up incrementally by rowid; a reset,
+    which deletes finalizations, always bumps state_version and reloads.
+    """
+    state_version = get_state().version
+    version = get_finalizations_version()
+    path = current_app.config["DATABASE"]
+    entry = _finalized.get(path)
+    if entry is not None and entry.state_version == state_version and entry.version == version:
+        return entry.voters
+    with _finalized_lock:
+        entry = _finalized.get(path)
+        if entry is None or entry.state_version != state_version:
+            entry = _FinalizedVoters(state_version)
+            entry.catch_up(version)
+            _finalized[path] = entry
+        elif entry.version != version:
+            entry.catch_up(version)
+    return entry.voters
+
+
 def is_voter_finalized(voter_id: str) -> bool:
     """True if voter explicitly finalised OR the voting deadline has passed."""
-    db = get_db()
-    row = db.execute(
-        "SELECT 1 FROM voter_finalizations WHERE voter_id = ?", (voter_id,)
-    ).fetchone()
-    if row:
+    if get_state().deadline_passed():
         return True
-    # Check if deadline has passed
-    dl = db.execute(
-        "SELECT value FROM tournament_state WHERE key = 'voting_deadline'"
-    ).fetchone()
-    if dl and dl["value"].strip():
-        try:
-            if datetime.now() > datetime.fromisoformat(dl["value"].strip()):
-                return True
-        except Exception:
-            pass
-    return False
+    return voter_id in _finalized_voters()
 
 
 def finalize_voter(voter_id: str):
     """Lock in this voter's picks — they can no longer change votes."""
     db = get_db()
-    db.execute(
+    cur = db.execute(
         "INSERT OR IGNORE INTO voter_finalizations (voter_id) VALUES (?)", (voter_id,)
     )
+    if cur.rowcount:
+        bump_finalizations_version()
     db.commit()
+    # Other workers catch up from finalizations_version; this one needn't wait
+    entry = _finalized.get(current_app.config["DATABASE"])
+    if entry is not None:
+        entry.voters.add(voter_id)
+    ctx = g.get("voter_contexts", {}).get(voter_id)
+    if ctx:
+        ctx.explicitly_finalized = True
 
 
 def cast_vote(match_id: int, voted_for: int, voter_id: str) -> dict:
@@ -61,52 +146,145 @@ def cast_vote(match_id: int, voted_for: int, voter_id: str) -> dict:
     if voted_for not in (match["year_a"], match["year_b"]):
         return {"success": False, "error": "Invalid year for this match"}
 
-    # INSERT OR REPLACE allows changing a previous vote
+    ingestor = current_app.extensions.get("vote_ingestor")
+    if ingestor:
+        # Group commit: the writer thread batches this with concurrent votes
+        error = ingestor.submit(match_id, voted_for, voter_id, request.remote_addr)
+        if error:
+            return {"success": False, "error": error}
+    else:
+        write_vote(match_id, voted_for, voter_id, request.remote_addr)
+        db.commit()
+
+    ctx = g.get("voter_contexts", {}).get(voter_id)
+    if ctx:
+        ctx.picks[match_id] = voted_for
+
+    return {"success": True, "voted_for": voted_for}
+
+
+def cast_votes(picks, voter_id: str) -> list:
+    """Cast several (match_id, year) picks at once; returns one result per pick.
+
+    Every pick is checked against a single read of the requested matches
+    before anything is written, so a finalised voter or a batch with nothing
+    valid never takes the write lock. Invalid picks (or a repeat of a match
+    already in the batch) get their own error without affecting the rest.
+    The valid ones go to the group-commit writer when it is on, else they
+    are written and committed together.
+    """
+    if is_voter_finalized(voter_id):
+        return [{"match_id": m, "success": False, "error": "Your votes are finalised"}
+                for m, _ in picks]
+    db = get_db()
+    active = {
+        r["match_id"]: (r["year_a"], r["year_b"]) for r in db.execute(
+            "SELECT match_id, year_a, year_b FROM matches "
+            "WHERE match_id IN (SELECT value FROM json_each(?)) "
+            "AND is_active = 1 AND winner IS NULL",
+            (json.dumps([m for m, _ in picks]),)
+        )
+    }
+    results, valid, seen = [], [], set()
+    for match_id, voted_for in picks:
+        if match_id in seen:
+            error = "Match already picked in this batch"
+        elif match_id not in active:
+            error = "Match is not active"
+        elif voted_for not in active[match_id]:
+            error = "Invalid year for this match"
+        else:
+            error = None
+            valid.append(len(results))
+        seen.add(match_id)
+        results.append({"match_id": match_id, "success": False, "error": error} if error
+                        else {"match_id": match_id, "success": True, "voted_for": voted_for})
+    if not valid:
+        return results
+
+    votes = [(picks[i][0], picks[i][1], voter_id, request.remote_addr) for i in valid]
+    ingestor = current_app.extensions.get("vote_ingestor")
+    if ingestor:
+        errors = ingestor.submit_many(votes)
+    else:
+        try:
+            for vote in votes:
+                write_vote(*vote)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        errors = [None] * len(votes)
+    for i, error in zip(valid, errors):
+        if error:
+            results[i] = {"match_id": picks[i][0], "success": False, "error": error}
+
+    ctx = g.get("voter_contexts", {}).get(voter_id)
+    if ctx:
+        ctx.picks.update((r["match_id"], r["voted_for"]) for r in results if r["success"])
+    return results
+
+
+def write_vote(match_id: int, voted_for: int, voter_id: str, ip_address):
+    """Write an already-validated vote and its tally change. Does not commit."""
+    db = get_db()
+    # INSERT OR REPLACE allows changing a previous vote. vote_tallies is kept in
+    # step in the same transaction: retract the old pick, then count the new one.
+    tallies.retract_vote(match_id, voter_id)
     db.execute(
         "INSERT OR REPLACE INTO votes (match_id, voted_for, voter_id, ip_address) "
         "VALUES (?, ?, ?, ?)",
-        (match_id, voted_for, voter_id, request.remote_addr),
+        (match_id, voted_for, voter_id, ip_address),
     )
-    db.commit()
-
-    return {"success": True, "voted_for": voted_for}
+    tallies.add_vote(match_id, voted_for)
 
 
 def get_match_results(match_id: int) -> dict:
     """Get vote counts for a match."""
-    db = get_db()
-    match = db.execute(
-        "SELECT * FROM matches WHERE match_id = ?", (match_id,)
-    ).fetchone()
-    if not match:
+    return get_results_for_matches([match_id]).get(match_id, {})
+
+
+def get_results_for_matches(match_ids) -> dict:
+    """Vote counts for several matches as {match_id: results}, in two queries."""
+    match_ids = list(match_ids)
+    if not match_ids:
         return {}
+    db = get_db()
+    matches = db.execute(
+        "SELECT * FROM matches WHERE match_id IN (SELECT value FROM json_each(?))",
+        (json.dumps(match_ids),)
+    ).fetchall()
 
-    votes_a = db.execute(
-        "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-        (match_id, match["year_a"])
-    ).fetchone()["c"]
-    votes_b = db.execute(
-        "SELECT COUNT(*) as c FROM votes WHERE match_id = ? AND voted_for = ?",
-        (match_id, match["year_b"])
-    ).fetchone()["c"]
-
-    total = votes_a + votes_b
-    return {
-        "year_a": match["year_a"],
-        "year_b": match["year_b"],
-        "votes_a": votes_a,
-        "votes_b": votes_b,
-        "pct_a": round(votes_a / total * 100, 1) if total > 0 else 0,
-        "pct_b": round(votes_b / total * 100, 1) if total > 0 else 0,
-        "total": total,
-    }
+    results = {}
+    for match in tallies.attach_tallies([dict(m) for m in matches]):
+        votes_a, votes_b = match["votes_a"], match["votes_b"]
+        total = votes_a + votes_b
+        results[match["match_id"]] = {
+            "round": match["round"],
+            "year_a": match["year_a"],
+            "year_b": match["year_b"],
+            "votes_a": votes_a,
+            "votes_b": votes_b,
+            "pct_a": round(votes_a / total * 100, 1) if total > 0 else 0,
+            "pct_b": round(votes_b / total * 100, 1) if total > 0 else 0,
+            "total": total,
+        }
+    return results
 
 
 def has_voted(match_id: int, voter_id: str):
     """Returns the year the voter chose for this match, or None."""
-    db = get_db()
-    row = db.execute(
-        "SELECT voted_for FROM votes WHERE match_id = ? AND voter_id = ?",
-        (match_id, voter_id),
-    ).fetchone()
-    return row["voted_for"] if row else None
+    return get_voter_context(voter_id).picks.get(match_id)
+
+
+def init_app(app):
+    # Bulk-load the finalized voters once at startup (before any fork), on a
+    # throwaway connection so the parent of a pre-forking server does not keep
+    # a pooled one open across fork (see database.init_db)
+    with app.app_context():
+        db = g.db = get_pool().connect()
+        try:
+            _finalized_voters()
+        finally:
+            del g.db
+            db.close()
@@ -6,6 +6,15 @@ document.addEventListener("DOMContentLoaded", function () {
         drawBracketLines();
     });
 
+    // Mark this voter's picks, then redraw connectors since labels change widths
+    if (typeof voterState !== "undefined") {
+        voterState.then(function (me) {
+            markUserPicks(me.picks);
+            fitBracket();
+            drawBracketLines();
+        });
+    }
+
     window.addEventListener("resize", function () {
         layoutBracket();
         fitBracket();
@@ -48,6 +57,26 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 });
 
+/**
+ * Adds a "(V)" label next to the year this voter picked in each match,
+ * struck through (pick-lost) if that year went on to lose.
+ */
+function markUserPicks(picks) {
+    document.querySelectorAll(".bracket-match").forEach(function (el) {
+        var pick = picks[el.getAttribute("data-match-id")];
+        if (!pick) return;
+        var winner = parseInt(el.getAttribute("data-winner")) || null;
+        el.querySelectorAll(".bracket-team").forEach(function (team) {
+            if (parseInt(team.getAttribute("data-year")) !== pick) return;
+            var label = document.createElement("span");
+            label.className = "my-pick-label" + (winner && winner !== pick ? " pick-lost" : "");
+            label.textContent = "(V)";
+            var link = team.querySelector("a");
+            team.insertBefore(label, link ? link.nextSibling : null);
+        });
+    });
+}
+
 /**
  * Positions each bracket-match absolutely within its round-matches container
  * so that every match is vertically centred between the two matches that feed
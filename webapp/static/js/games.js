@@ -0,0 +1,43 @@
+/**
+ * Matchup pages render only the first page of each year's games. The
+ * "Show more games" button at the end of a column fetches the next page
+ * when clicked or scrolled into view, until the year runs out.
+ */
+document.addEventListener("DOMContentLoaded", function () {
+    var observer = "IntersectionObserver" in window
+        ? new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) loadMore(entry.target);
+            });
+        }, { rootMargin: "200px" })
+        : null;
+
+    function loadMore(btn) {
+        if (btn.dataset.loading) return;
+        btn.dataset.loading = "true";
+        fetch("/year/" + btn.dataset.year + "/games?page=" + btn.dataset.page)
+            .then(function (resp) { return resp.json(); })
+            .then(function (data) {
+                btn.insertAdjacentHTML("beforebegin", data.html);
+                delete btn.dataset.loading;
+                if (!data.next_page) {
+                    if (observer) observer.unobserve(btn);
+                    btn.remove();
+                    return;
+                }
+                btn.dataset.page = data.next_page;
+                btn.textContent = "Show " + data.remaining + " more games";
+                if (observer) {
+                    // Re-observe so a button still in view triggers the next page
+                    observer.unobserve(btn);
+                    observer.observe(btn);
+                }
+            })
+            .catch(function () { delete btn.dataset.loading; });
+    }
+
+    document.querySelectorAll(".more-games").forEach(function (btn) {
+        btn.addEventListener("click", function () { loadMore(btn); });
+        if (observer) observer.observe(btn);
+    });
+});
@@ -0,0 +1,24 @@
+/**
+ * Personal state for the current voter: their picks, whether their votes are
+ * locked in, and any revealed results they are allowed to see.
+ *
+ * Pages are rendered identically for everyone so they can be cached; this one
+ * small request fills in what is specific to the visitor. Page scripts wait on
+ * `voterState` and update the DOM once it resolves.
+ */
+var voterState = fetch("/me", { credentials: "same-origin", cache: "no-store" })
+    .then(function (resp) { return resp.json(); })
+    .catch(function () { return { picks: {}, finalized: false, results: {} }; });
+
+/**
+ * Send several picks in one request to /votes/batch. Resolves to its JSON:
+ * { success, results: [{ match_id, success, voted_for | error }, ...] }.
+ */
+function submitPicks(picks) {
+    return fetch("/votes/batch", {
+        method: "POST",
+        credentials: "same-origin",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ picks: picks }),
+    }).then(function (resp) { return resp.json(); });
+}
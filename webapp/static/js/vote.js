@@ -1,5 +1,5 @@
 document.addEventListener("DOMContentLoaded", function () {
-    document.getElementById("matchup-columns");
+    var columns = document.getElementById("matchup-columns");
 
     // Attach listeners to all vote buttons (including switch-btn)
     function attachListeners() {
@@ -41,19 +41,71 @@ document.addEventListener("DOMContentLoaded", function () {
             });
     }
 
-    function showVotedState(votedYear) {
-        // Update banner
+    // The status banner sits just above the tier comparison
+    function getBanner() {
         var banner = document.getElementById("results-banner");
         if (!banner) {
             banner = document.createElement("div");
             banner.id = "results-banner";
-            var title = document.querySelector(".matchup-title");
-            title.parentNode.insertBefore(banner, title.nextSibling);
+            var anchor = document.querySelector(".tier-comparison") || columns;
+            anchor.parentNode.insertBefore(banner, anchor);
         }
-        banner.className = "voted-notice";
+        return banner;
+    }
+
+    function showResults(results) {
+        var flip = columns.dataset.flip === "true";
+        var leftPct = flip ? results.pct_b : results.pct_a;
+        var rightPct = flip ? results.pct_a : results.pct_b;
+        var banner = getBanner();
+        banner.className = "results-banner";
         banner.innerHTML =
-            "<p><strong>&#10003; You voted for " + votedYear + ".</strong></p>" +
-            "<p class=\"voted-subtext\">You can still change your pick below till the deadline.</p>";
+            "<div class=\"result-row\">" +
+            "<div class=\"result-side-label\"><strong>" + columns.dataset.leftYear + "</strong><span>" + leftPct + "%</span></div>" +
+            "<div class=\"result-bar\">" +
+            "<div class=\"bar-fill bar-a\" style=\"width: " + leftPct + "%\"></div>" +
+            "<div class=\"bar-fill bar-b\" style=\"width: " + rightPct + "%\"></div>" +
+            "</div>" +
+            "<div class=\"result-side-label right-label\"><span>" + rightPct + "%</span><strong>" + columns.dataset.rightYear + "</strong></div>" +
+            "</div>" +
+            "<p class=\"vote-count\">" + results.total + " total vote" + (results.total !== 1 ? "s" : "") + "</p>";
+    }
+
+    function markSelected(votedYear) {
+        document.querySelectorAll(".year-column").forEach(function (col) {
+            col.classList.toggle("selected", parseInt(col.dataset.year) === votedYear);
+        });
+    }
+
+    // Votes can no longer change: keep a "Your vote" marker, drop the buttons
+    function showLockedState(votedYear, withNotice) {
+        if (withNotice) {
+            var banner = getBanner();
+            banner.className = "voted-notice";
+            banner.innerHTML =
+                "<p><strong>&#10003; Your vote is locked in.</strong></p>" +
+                "<p class=\"voted-subtext\">Results will be revealed by the admin after the round ends.</p>";
+        }
+        document.querySelectorAll(".vote-btn").forEach(function (b) {
+            if (parseInt(b.dataset.year) === votedYear) {
+                var mark = document.createElement("mark");
+                mark.textContent = "Your vote";
+                b.parentNode.replaceChild(mark, b);
+            } else {
+                b.remove();
+            }
+        });
+        markSelected(votedYear);
+    }
+
+    function showVotedState(votedYear, withNotice) {
+        if (withNotice !== false) {
+            var banner = getBanner();
+            banner.className = "voted-notice";
+            banner.innerHTML =
+                "<p><strong>&#10003; You voted for " + votedYear + ".</strong></p>" +
+                "<p class=\"voted-subtext\">You can still change your pick below till the deadline.</p>";
+        }
 
         // Update buttons: current pick → disabled; other year → switch button
         document.querySelectorAll(".vote-btn").forEach(function (b) {
@@ -75,4 +127,22 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 
     attachListeners();
+
+    // Apply this voter's personal state to the shared page
+    voterState.then(function (me) {
+        var matchId = columns.dataset.match;
+        var pick = me.picks[matchId];
+        var results = me.results[matchId];
+        // Revealed results take the banner; otherwise it shows the vote notice
+        var hasResults = !!document.getElementById("results-banner") || !!results;
+        if (results && !document.getElementById("results-banner")) showResults(results);
+        if (!pick) return;
+        if (columns.dataset.open !== "true") {
+            markSelected(pick);
+        } else if (me.finalized) {
+            showLockedState(pick, !hasResults);
+        } else {
+            showVotedState(pick, !hasResults);
+        }
+    });
 });
@@ -0,0 +1,153 @@
+"""Local copies of the games' BGG thumbnails, resized to card size.
+
+Usage:
+  python -m webapp.thumbnails [--db PATH] [--source-dir DIR] [--size 240]
+                              [--workers 8]
+
+Fetches every thumbnail_url that has no local copy yet, crops it square,
+scales it down to at most --size pixels (the card's width at 2x), and
+writes it as WebP under static/thumbs/, named by a hash of its contents.
+The thumbnails table maps each source URL to its file; the matchup pages
+show the local copy when there is one and fall back to the BGG URL when
+there isn't.
+
+Files never change once written, so they're served with a one-year
+immutable Cache-Control (see assets.py). Re-running only fetches URLs it hasn't seen,
+including those of newly imported games. --source-dir reads images from a
+directory (by the URL's file name) instead of downloading them.
+
+Needs Pillow (pip install pillow); the web app itself doesn't.
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from webapp.config import Config
+from webapp.database import migrate
+
+STATIC_DIR = Path(__file__).parent / "static"
+THUMBS_DIR = "thumbs"  # kept in step with assets.IMMUTABLE_PREFIXES
+
+
+def http_fetcher(timeout=10):
+    """Fetch an image over HTTP(S)."""
+    def fetch(url):
+        req = urllib.request.Request(url, headers={"User-Agent": "bg-best-year thumbnails"})
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.read()
+    return fetch
+
+
+def directory_fetcher(root):
+    """Read an image from `root` by the URL's file name (for tests and offline builds)."""
+    root = Path(root)
+
+    def fetch(url):
+        return (root / Path(urlsplit(url).path).name).read_bytes()
+    return fetch
+
+
+def resize(data, size):
+    """Center-crop image bytes to a square of at most `size` pixels, as WebP."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        edge = min(size, *image.size)  # never scale up
+        image = ImageOps.fit(image, (edge, edge), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, "WEBP", quality=80, method=6)
+    return out.getvalue()
+
+
+def store(data, static_dir=STATIC_DIR):
+    """Write `data` under static/thumbs/ by its hash; returns the path relative to static/."""
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    path = f"{THUMBS_DIR}/{digest[:2]}/{digest}.webp"
+    target = Path(static_dir) / path
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Identical images can be stored by two threads at once
+        fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+    return path
+
+
+def pending_urls(db):
+    """Thumbnail URLs of stored games that have no local copy yet."""
+    return [url for (url,) in db.execute("""
+        SELECT DISTINCT g.thumbnail_url FROM games g
+        LEFT JOIN thumbnails t ON t.source_url = g.thumbnail_url
+        WHERE g.thumbnail_url IS NOT NULL AND t.source_url IS NULL
+    """)]
+
+
+def build_thumbnails(db, fetch, size=240, workers=8, static_dir=STATIC_DIR):
+    """Fetch, resize and store every pending thumbnail; returns (stored, failures).
+
+    Downloads run on `workers` threads; the rows are written in one
+    transaction at the end, which also bumps games_version so running
+    workers re-render their cached game tiles with the new URLs.
+    """
+    def build(url):
+        try:
+            return url, store(resize(fetch(url), size), static_dir), None
+        except Exception as e:
+            return url, None, e
+
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(build, pending_urls(db)))
+    stored = [(url, path) for url, path, _ in results if path]
+    failures = [(url, error) for url, _, error in results if error]
+
+    if stored:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO thumbnails (source_url, path) VALUES (?, ?)", stored
+            )
+            db.execute(
+                "INSERT INTO tournament_state (key, value) VALUES ('games_version', '1') "
+                "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+    return len(stored), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=Config.DATABASE)
+    parser.add_argument("--source-dir", help="read images from this directory instead of BGG")
+    parser.add_argument("--size", type=int, default=Config.THUMBNAIL_SIZE, help="card size in pixels")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent downloads")
+    args = parser.parse_args()
+
+    fetch = directory_fetcher(args.source_dir) if args.source_dir else http_fetcher()
+    db = sqlite3.connect(args.db)
+    try:
+        migrate(db)
+        stored, failures = build_thumbnails(db, fetch, args.size, args.workers)
+    finally:
+        db.close()
+    for url, error in failures:
+        print(f"failed: {url}: {error}")
+    print(f"Stored {stored} thumbnails under {STATIC_DIR / THUMBS_DIR}; {len(failures)} failed")
+
+
+if __name__ == "__main__":
+    main()
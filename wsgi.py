@@ -5,6 +5,9 @@ In the PythonAnywhere Web tab, set:
   Source code:   /home/<username>/bg_best_year
   Working dir:   /home/<username>/bg_best_year
   WSGI file:     /home/<username>/bg_best_year/wsgi.py
+
+After each deploy, build the static assets before reloading:
+  python -m webapp.assets
 """
 
 import sys
@@ -19,6 +22,9 @@ if project_home not in sys.path:
 # Set required environment variables if not already set via the PA env-var panel
 os.environ.setdefault("SECRET_KEY", "CHANGE-ME-IN-PYTHONANYWHERE-ENV-VARS")
 os.environ.setdefault("ADMIN_SECRET", "CHANGE-ME-IN-PYTHONANYWHERE-ENV-VARS")
+# Requests arrive through PythonAnywhere's front-end proxy; take the client IP
+# from its X-Forwarded-For so rate limits are per voter IP, not per proxy
+os.environ.setdefault("TRUSTED_PROXY_HOPS", "1")
 
 from webapp.app import create_app
 